@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from sqlalchemy import func, select, text
+from config import settings
+from database import async_session
+
+log = logging.getLogger("tutorhelper.stats")
+
+# Ключ pg_try_advisory_xact_lock: представления обновляет один воркер за такт
+REFRESH_LOCK = 0x7374617473
+# Счетчики занятий и журнала поддерживаются триггерами (миграция 0012); здесь только
+# то, что инкрементально не считается
+MATERIALIZED_VIEWS = ["student_streaks"]
+
+
+# CONCURRENTLY не блокирует чтение представления на время пересчета
+class StatsRefresher:
+    def __init__(self):
+        self.task = None
+
+    async def start(self):
+        self.task = asyncio.create_task(self._loop(), name="stats-refresh")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Ошибка обновления статистики")
+            await asyncio.sleep(settings.STATS_REFRESH_INTERVAL)
+
+    async def refresh(self) -> bool:
+        async with async_session() as session:
+            locked = await session.scalar(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK)))
+            if not locked:
+                return False
+            for view in MATERIALIZED_VIEWS:
+                await session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+            await session.commit()
+        return True
+
+
+refresher = StatsRefresher()
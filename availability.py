@@ -0,0 +1,197 @@
+import datetime as dt
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from config import settings
+from models.models import Schedule
+
+# Верхняя граница длительности занятия (ограничение ck_schedule_duration_minutes):
+# пересекать интервал [start, end) могут только занятия, начавшиеся не раньше start - MAX_DURATION
+MAX_DURATION = dt.timedelta(minutes=24 * 60)
+OWNERS = {"tutor_id": "репетитор", "student_id": "ученик", "place_id": "место"}
+LOCK_SPACES = {"tutor_id": 1, "student_id": 2, "place_id": 3}
+LOCK_BUCKETS = 256
+IN_CHUNK = 5_000
+
+
+def lesson_interval(date: dt.date, time_: dt.time, duration_minutes: int) -> tuple:
+    start = dt.datetime.combine(date, time_)
+    return start, start + dt.timedelta(minutes=duration_minutes)
+
+
+# Занятия одного владельца (репетитора, ученика или места), упорядоченные по началу.
+# Поиск пересечений - два бинарных поиска и просмотр занятий, начавшихся в пределах
+# MAX_DURATION до интервала; данные, накопленные до проверок, могут пересекаться
+class IntervalIndex:
+    __slots__ = ("starts", "ends", "ids", "loaded_at")
+
+    def __init__(self, intervals=()):
+        items = sorted(intervals)
+        self.starts = [item[0] for item in items]
+        self.ends = [item[1] for item in items]
+        self.ids = [item[2] for item in items]
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, start: dt.datetime, end: dt.datetime, lesson_id):
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.ids.insert(index, lesson_id)
+
+    def busy(self, start: dt.datetime, end: dt.datetime, exclude=None) -> list:
+        lo = bisect_right(self.starts, start - MAX_DURATION)
+        hi = bisect_left(self.starts, end)
+        return [(self.starts[i], self.ends[i], self.ids[i]) for i in range(lo, hi)
+                if self.ends[i] > start and self.ids[i] != exclude]
+
+
+# Свободные окна длиной не меньше duration в рабочие часы каждого дня
+def free_slots(indexes: list, date_from: dt.date, days: int, duration: dt.timedelta,
+               day_start: dt.time, day_end: dt.time) -> list:
+    slots = []
+    for offset in range(days):
+        day = date_from + dt.timedelta(days=offset)
+        window_start, window_end = dt.datetime.combine(day, day_start), dt.datetime.combine(day, day_end)
+        busy = sorted((start, end) for index in indexes for start, end, _ in index.busy(window_start, window_end))
+        cursor = window_start
+        for start, end in busy:
+            if start - cursor >= duration:
+                slots.append((cursor, start))
+            cursor = max(cursor, end)
+        if window_end - cursor >= duration:
+            slots.append((cursor, window_end))
+    return slots
+
+
+# Индексы занятости загружаются из БД при первом обращении и живут AVAILABILITY_TTL
+# секунд; новые занятия этого процесса добавляются в них сразу, изменение и удаление
+# сбрасывают индекс. Записи через другие воркеры индекс видит только после истечения
+# TTL, поэтому он используется лишь для ответов о свободном времени, а при записи
+# решение принимается по БД под advisory-блокировкой (см. reserve).
+# Индекс строится на окно дат [date_from, date_to] - загружаются только занятия окна
+# и MAX_DURATION до него (индекс ix_schedule_<владелец>_id_date_time), а не вся история владельца
+class AvailabilityEngine:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.indexes = OrderedDict()  # (столбец, владелец) -> {(date_from, date_to): индекс}
+
+    async def index(self, db: Session, column: str, owner_id: uuid.UUID,
+                    date_from: dt.date, date_to: dt.date) -> IntervalIndex:
+        key, window = (column, owner_id), (date_from, date_to)
+        windows = self.indexes.setdefault(key, {})
+        index = windows.get(window)
+        if index is None or time.monotonic() - index.loaded_at > settings.AVAILABILITY_TTL:
+            result = await db.execute(
+                select(Schedule.date, Schedule.time, Schedule.duration_minutes, Schedule.id)
+                .where(getattr(Schedule, column) == owner_id,
+                       Schedule.date.between(date_from - MAX_DURATION, date_to))
+            )
+            index = IntervalIndex(lesson_interval(*row[:3]) + (row[3],) for row in result.all())
+            # Устаревшие окна владельца удаляются, чтобы их число не росло с каждой новой неделей
+            for stale in [w for w, i in windows.items() if index.loaded_at - i.loaded_at > settings.AVAILABILITY_TTL]:
+                del windows[stale]
+            windows[window] = index
+            while len(self.indexes) > self.maxsize:
+                self.indexes.popitem(last=False)
+        self.indexes.move_to_end(key)
+        return index
+
+    def added(self, row):
+        start, end = lesson_interval(row["date"], row["time"], row["duration_minutes"])
+        for column in OWNERS:
+            for (date_from, date_to), index in self.indexes.get((column, row[column]), {}).items():
+                if date_from - MAX_DURATION <= row["date"] <= date_to:
+                    index.add(start, end, row["id"])
+
+    def invalidate(self, row):
+        for column in OWNERS:
+            self.indexes.pop((column, row.get(column)), None)
+
+    def clear(self):
+        self.indexes.clear()
+
+
+availability = AvailabilityEngine(settings.AVAILABILITY_MAX_OWNERS)
+
+
+def conflict(column: str, lesson_id) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT,
+                         detail=f"Время занято ({OWNERS[column]}): пересечение с занятием {lesson_id}")
+
+
+# Блокировки на время транзакции записи: занятия одного владельца не проверяются и
+# не вставляются параллельно. Владельцы хешируются в LOCK_BUCKETS корзин, чтобы
+# массовая загрузка не исчерпала таблицу блокировок; порядок исключает взаимоблокировки
+async def lock_owners(db: Session, rows: list):
+    keys = {(LOCK_SPACES[column], row[column].int % LOCK_BUCKETS)
+            for row in rows for column in OWNERS if row.get(column) is not None}
+    if db.bind.dialect.name != "postgresql":
+        # В SQLite пишет одна транзакция за раз: пустое обновление сразу берет блокировку записи
+        if keys:
+            await db.execute(text("UPDATE schedule SET id = id WHERE 0"))
+        return
+    for space, bucket in sorted(keys):
+        await db.execute(select(func.pg_advisory_xact_lock(space, bucket)))
+
+
+# Занятия владельцев из rows в диапазоне дат одним запросом на вид владельца
+async def load_indexes(db: Session, rows: list, exclude: set = frozenset()) -> dict:
+    dates = [row["date"] for row in rows]
+    date_from, date_to = min(dates) - dt.timedelta(days=1), max(dates) + dt.timedelta(days=1)
+    indexes = {}
+    for column in OWNERS:
+        owners = list({row[column] for row in rows if row.get(column) is not None})
+        for i in range(0, len(owners), IN_CHUNK):
+            owner_column = getattr(Schedule, column)
+            result = await db.execute(
+                select(owner_column, Schedule.date, Schedule.time, Schedule.duration_minutes, Schedule.id)
+                .where(owner_column.in_(owners[i:i + IN_CHUNK]), Schedule.date.between(date_from, date_to))
+            )
+            for owner, *lesson, lesson_id in result.all():
+                if lesson_id not in exclude:
+                    indexes.setdefault((column, owner), IntervalIndex()).add(*lesson_interval(*lesson), lesson_id)
+    return indexes
+
+
+# Проверка одного занятия при создании или изменении - только по БД под блокировкой
+# владельцев: индекс в памяти процесса не видит изменений, сделанных другими воркерами
+async def reserve(db: Session, row: dict, exclude_id=None):
+    start, end = lesson_interval(row["date"], row["time"], row["duration_minutes"])
+    owners = [column for column in OWNERS if row.get(column) is not None]
+    await lock_owners(db, [row])
+    indexes = await load_indexes(db, [row], {exclude_id})
+    for column in owners:
+        index = indexes.get((column, row[column]))
+        busy = index.busy(start, end) if index is not None else []
+        if busy:
+            raise conflict(column, busy[0][2])
+
+
+# Проверка пачки: пересечения с БД и между строками самой пачки
+async def reserve_many(db: Session, valid: dict, errors: list):
+    if not valid:
+        return
+    rows = list(valid.values())
+    await lock_owners(db, rows)
+    indexes = await load_indexes(db, rows)
+    for position, row in sorted(valid.items(), key=lambda item: (item[1]["date"], item[1]["time"])):
+        start, end = lesson_interval(row["date"], row["time"], row["duration_minutes"])
+        owners = [column for column in OWNERS if row.get(column) is not None]
+        for column in owners:
+            index = indexes.get((column, row[column]))
+            busy = index.busy(start, end) if index is not None else []
+            if busy:
+                errors.append({"index": position, "detail": conflict(column, busy[0][2]).detail})
+                del valid[position]
+                break
+        else:
+            row.setdefault("id", uuid.uuid4())
+            for column in owners:
+                indexes.setdefault((column, row[column]), IntervalIndex()).add(start, end, row["id"])
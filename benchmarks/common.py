@@ -0,0 +1,60 @@
+import json
+import math
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+
+
+def write_report(path: str | None, report: dict):
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if path:
+        Path(path).write_text(text, encoding="utf-8")
+    print(text)
+
+
+# Сравнение с сохраненной базовой линией: для метрик из higher_is_better
+# регрессией считается падение, для остальных - рост больше чем на tolerance
+def compare(results: dict, baseline_path: str, tolerance: float, higher_is_better=("rps", "ops_per_sec"),
+            watched=("rps", "p95_ms", "p99_ms", "ops_per_sec")) -> list:
+    path = Path(baseline_path)
+    if not path.exists():
+        print(f"Базовая линия {baseline_path} не найдена, сравнение пропущено", file=sys.stderr)
+        return []
+    baseline = json.loads(path.read_text(encoding="utf-8"))["results"]
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in watched:
+            if metric not in current or not base.get(metric):
+                continue
+            change = (current[metric] - base[metric]) / base[metric]
+            worse = -change if metric in higher_is_better else change
+            if worse > tolerance:
+                regressions.append(f"{key}: {metric} {base[metric]} -> {current[metric]} ({change:+.0%})")
+    for line in regressions:
+        print("РЕГРЕССИЯ", line, file=sys.stderr)
+    return regressions
+
+
+def save_baseline(path: str, report: dict):
+    Path(path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Базовая линия сохранена в {path}", file=sys.stderr)
@@ -0,0 +1,121 @@
+# Микробенчмарки горячих участков кода, не требующие базы данных.
+#
+#   python -m benchmarks.micro --output micro.json --baseline benchmarks/micro_baseline.json
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+for name, value in {"POSTGRES_USER": "postgres", "POSTGRES_PASSWORD": "", "POSTGRES_HOST": "localhost",
+                    "POSTGRES_PORT": "5432", "POSTGRES_DB": "bench", "SECRET_KEY": "bench-secret-key"}.items():
+    os.environ.setdefault(name, value)
+
+from benchmarks.common import compare, environment, save_baseline, write_report  # noqa: E402
+
+
+def measure(func, min_time: float) -> dict:
+    loops, elapsed = 1, 0.0
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    return {"ops_per_sec": round(loops / elapsed, 1), "us_per_op": round(elapsed / loops * 1e6, 3)}
+
+
+def cases(lessons: int) -> dict:
+    from datetime import date, datetime, time as dtime, timedelta
+    from availability import IntervalIndex, free_slots
+    from cache import LRUCache
+    from metrics import Histogram, registry
+    from public.pagination import decode_cursor, encode_cursor
+    from security import create_token, decode_token
+
+    token = create_token(uuid.uuid4(), "user", "student", "access")
+    cache = LRUCache(10_000)
+    keys = [f"student:{uuid.uuid4()}" for _ in range(20_000)]
+    for key in keys[:10_000]:
+        cache.set(key, {"id": key}, 60)
+    counter = iter(range(10 ** 12))
+    histogram = Histogram("bench_histogram", "")
+    registry.remove(histogram)
+    key = uuid.uuid4()
+    cursor = encode_cursor(key)
+    # Репетитор с lessons занятиями: по 6 в день, начиная с 2020 года
+    day0 = date(2020, 1, 6)
+    index = IntervalIndex(
+        (start, start + timedelta(minutes=60), uuid.uuid4())
+        for n in range(lessons)
+        for start in [datetime.combine(day0 + timedelta(days=n // 6), dtime(9 + 2 * (n % 6)))]
+    )
+    probes = [datetime.combine(day0 + timedelta(days=d), dtime(10, 30)) for d in range(0, lessons // 6, 7)]
+    return {
+        "token.create": lambda: create_token(key, "user", "student", "access"),
+        "token.decode": lambda: decode_token(token),
+        "cache.get_hit": lambda: cache.get(keys[next(counter) % 10_000]),
+        "cache.set_evict": lambda: cache.set(keys[next(counter) % 20_000], {}, 60),
+        "cursor.encode": lambda: encode_cursor(key),
+        "cursor.decode": lambda: decode_cursor(cursor),
+        "metrics.histogram_observe": lambda: histogram.observe(value=0.0123),
+        "availability.conflict_check": lambda: conflict_check(index, probes[next(counter) % len(probes)]),
+        "availability.free_slots_week": lambda: free_slots(
+            [index], probes[next(counter) % len(probes)].date(), 7, timedelta(minutes=60), dtime(9), dtime(21)),
+    }
+
+
+def conflict_check(index, start):
+    from datetime import timedelta
+    return index.busy(start, start + timedelta(minutes=60))
+
+
+async def hashing(rounds: int, count: int) -> dict:
+    from security import hash_password
+    start = time.perf_counter()
+    await asyncio.gather(*(hash_password("password") for _ in range(count)))
+    elapsed = time.perf_counter() - start
+    return {"ops_per_sec": round(count / elapsed, 1), "us_per_op": round(elapsed / count * 1e6, 3),
+            "bcrypt_rounds": rounds}
+
+
+def main(args) -> int:
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    results = {}
+    for name, func in cases(args.lessons).items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(func, args.min_time)
+        print(f"{name:<28} {results[name]['ops_per_sec']:>14} оп/с", file=sys.stderr)
+    if not args.only or args.only in "security.hash_password":
+        results["security.hash_password"] = asyncio.run(hashing(args.bcrypt_rounds, args.hash_count))
+    report = {"meta": environment(), "results": results}
+    write_report(args.output, report)
+    if args.save_baseline:
+        save_baseline(args.baseline, report)
+        return 0
+    return 1 if compare(results, args.baseline, args.tolerance) else 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Микробенчмарки")
+    parser.add_argument("--min-time", type=float, default=0.5, help="минимальное время замера одного случая, с")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--hash-count", type=int, default=32)
+    parser.add_argument("--lessons", type=int, default=5_000, help="число занятий репетитора в индексе занятости")
+    parser.add_argument("--only")
+    parser.add_argument("--output")
+    parser.add_argument("--baseline", default=str(ROOT / "benchmarks" / "micro_baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,210 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from sqlalchemy import column, func, select
+from sqlalchemy.dialects.postgresql import array
+from config import settings
+from database import async_engine
+
+log = logging.getLogger("tutorhelper.cache")
+
+# Канал NOTIFY: воркер, изменивший запись, сообщает остальным ключ (или префикс "сущность:"),
+# который нужно сбросить в их локальных кэшах; слушает канал pubsub.hub
+INVALIDATION_CHANNEL = "cache_invalidate"
+
+
+# Интерфейс общего (межпроцессного) хранилища кэша, например Redis.
+# get возвращает значение вместе с оставшимся временем жизни (как GET + PTTL в Redis)
+class CacheBackend:
+    async def get(self, key: str) -> Optional[tuple]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def clear(self, prefix: str):
+        raise NotImplementedError
+
+
+# Локальная замена общего хранилища для разработки и тестов
+class MemoryBackend(CacheBackend):
+    def __init__(self):
+        self._data = {}
+
+    async def get(self, key: str) -> Optional[tuple]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        ttl = expires - time.monotonic()
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return None
+        return value, ttl
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._data[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def clear(self, prefix: str):
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            del self._data[key]
+
+
+# LRU-кэш в памяти процесса с ограничением по размеру и времени жизни записей
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self, prefix: str = ""):
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Поколения защищают от записи в кэш значения, прочитанного до сброса: читатель
+# запоминает generation(entity) до запроса к БД и передает его в set; если за это
+# время пришел сброс сущности (свой или от другого воркера), значение не кэшируется
+class EntityCache:
+    def __init__(self, local: LRUCache, shared: Optional[CacheBackend] = None):
+        self.local = local
+        self.shared = shared
+        self.hits = {}
+        self.misses = {}
+        self.epoch = 0
+        self.generations = {}
+
+    @staticmethod
+    def key(entity: str, object_id) -> str:
+        return f"{entity}:{object_id}"
+
+    def generation(self, entity: str) -> tuple:
+        return self.epoch, self.generations.get(entity, 0)
+
+    def _bump(self, entity: str):
+        self.generations[entity] = self.generations.get(entity, 0) + 1
+
+    async def get(self, entity: str, object_id) -> Optional[Any]:
+        if not settings.CACHE_ENABLED:
+            return None
+        key = self.key(entity, object_id)
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            item = await self.shared.get(key)
+            if item is not None:
+                # Локальная копия живет не дольше записи в общем хранилище
+                value, ttl = item
+                self.local.set(key, value, ttl)
+        if value is None:
+            self.misses[entity] = self.misses.get(entity, 0) + 1
+        else:
+            self.hits[entity] = self.hits.get(entity, 0) + 1
+        return value
+
+    async def set(self, entity: str, object_id, value: Any, ttl: float, generation: Optional[tuple] = None):
+        if not settings.CACHE_ENABLED:
+            return
+        if generation is not None and generation != self.generation(entity):
+            return
+        key = self.key(entity, object_id)
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            await self.shared.set(key, value, ttl)
+
+    async def invalidate(self, entity: str, object_id):
+        key = self.key(entity, object_id)
+        self._bump(entity)
+        self.local.delete(key)
+        if self.shared is not None:
+            await self.shared.delete(key)
+        await self.broadcast(key)
+
+    async def invalidate_many(self, entity: str, object_ids):
+        keys = [self.key(entity, object_id) for object_id in object_ids]
+        self._bump(entity)
+        for key in keys:
+            self.local.delete(key)
+            if self.shared is not None:
+                await self.shared.delete(key)
+        await self.broadcast(*keys)
+
+    # Сброс всех записей сущности: после каскадного или массового удаления,
+    # когда список затронутых идентификаторов неизвестен
+    async def invalidate_all(self, entity: str):
+        prefix = f"{entity}:"
+        self._bump(entity)
+        self.local.clear(prefix)
+        if self.shared is not None:
+            await self.shared.clear(prefix)
+        await self.broadcast(prefix)
+
+    # Сброс по сообщению другого воркера - только в памяти этого процесса
+    def drop(self, key: str):
+        self._bump(key.partition(":")[0])
+        if key.endswith(":"):
+            self.local.clear(key)
+        else:
+            self.local.delete(key)
+
+    # Полный сброс локальной памяти (сообщения о сбросе могли быть потеряны)
+    def clear_local(self):
+        self.epoch += 1
+        self.local.clear()
+
+    # Запись уже зафиксирована: если сообщение не ушло, другие воркеры отдают старое
+    # значение до истечения TTL, поэтому ошибка только пишется в журнал
+    async def broadcast(self, *keys: str):
+        if not keys or not settings.CACHE_ENABLED or not settings.CACHE_INVALIDATION_ENABLED:
+            return
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(select(func.pg_notify(INVALIDATION_CHANNEL, column("key")))
+                                   .select_from(func.unnest(array(keys)).alias("key")))
+        except Exception:
+            log.warning("Не удалось разослать сброс кэша %s", keys[:10], exc_info=True)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.local),
+            "maxsize": self.local.maxsize,
+            "evictions": self.local.evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+entity_cache = EntityCache(
+    LRUCache(settings.CACHE_MAXSIZE),
+    MemoryBackend() if settings.CACHE_SHARED_BACKEND == "memory" else None,
+)
@@ -1,23 +1,152 @@
+import time
+import uuid
+from pathlib import Path
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from models.models import Base
 from config import settings
+from metrics import TimedQueuePool, instrument_engine
+from models.models import Base
+
+URL = make_url(settings.DATABASE_URL)
+IS_POSTGRES = URL.get_backend_name() == "postgresql"
+# Для SQLite: WAL - чтение не блокируется записью; synchronous=NORMAL в режиме WAL не
+# теряет целостность при сбое; foreign_keys включает ON DELETE CASCADE / SET NULL
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "foreign_keys=ON",
+    "temp_store=MEMORY",
+    "cache_size=-65536",
+    "mmap_size=268435456",
+)
+
+
+def connect_args() -> dict:
+    if not IS_POSTGRES:
+        return {}
+    if settings.DB_PGBOUNCER:
+        # PgBouncer в режиме транзакций не сохраняет подготовленные выражения между
+        # транзакциями: отключаем кэш и даем выражениям уникальные имена
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+def engine_options(pool_size: int | None = None, max_overflow: int | None = None) -> dict:
+    if URL.get_backend_name() == "sqlite" and URL.database in (None, "", ":memory:"):
+        # БД в памяти живет, пока открыто ее единственное соединение: сеансы получают его
+        # из пула по очереди, и транзакции разных запросов не смешиваются
+        pool_size, max_overflow = 1, 0
+    return {
+        "echo": settings.SQL_ECHO,
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE if pool_size is None else pool_size,
+        "max_overflow": settings.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE if IS_POSTGRES else -1,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args(),
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS + (f"busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",):
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+
+async_engine = create_async_engine(settings.DATABASE_URL, **engine_options())
+instrument_engine(async_engine)
+if URL.get_backend_name() == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+async_session = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+# Реплика для чтения; без POSTGRES_READ_URLA чтение идет в основную БД
+if settings.POSTGRES_READ_URLA:
+    read_engine = create_async_engine(settings.POSTGRES_READ_URLA, **engine_options(
+        settings.DB_READ_POOL_SIZE, settings.DB_READ_MAX_OVERFLOW))
+    instrument_engine(read_engine, "replica")
+    read_session = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+else:
+    read_engine = async_engine
+    read_session = async_session
+
 
-async_engine = create_async_engine(settings.POSTGRES_URLA, echo=True)
-async_session = sessionmaker(async_engine, class_=AsyncSession)
+# Соединения aiosqlite держат рабочие потоки, без закрытия пула процесс не завершится
+async def dispose_engines():
+    await async_engine.dispose()
+    if read_engine is not async_engine:
+        await read_engine.dispose()
 
-async def init_db():
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+ALEMBIC_INI = Path(__file__).resolve().parent / "alembic.ini"
+# После записи клиент READ_YOUR_WRITES_SECONDS читает из основной БД, чтобы
+# не увидеть собственные изменения с задержкой репликации
+WRITE_COOKIE = "rw_until"
 
-async def get_db():
+
+def reads_primary(request: Request) -> bool:
+    if read_session is async_session or not settings.READ_YOUR_WRITES_SECONDS:
+        return True
+    try:
+        until = float(request.cookies.get(WRITE_COOKIE, 0))
+    except ValueError:
+        return False
+    return time.time() < until <= time.time() + settings.READ_YOUR_WRITES_SECONDS
+
+
+def session_for(request: Request) -> sessionmaker:
+    return async_session if reads_primary(request) else read_session
+
+
+async def get_write_db(response: Response):
+    if read_session is not async_session and settings.READ_YOUR_WRITES_SECONDS:
+        response.set_cookie(WRITE_COOKIE, str(time.time() + settings.READ_YOUR_WRITES_SECONDS),
+                            max_age=settings.READ_YOUR_WRITES_SECONDS, httponly=True, samesite="lax")
     async with async_session() as session:
         try:
             yield session
         finally:
             await session.close()
 
-async def create_async_tables():
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+
+async def get_read_db(request: Request):
+    async with session_for(request)() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+get_db = get_write_db
+
+# Схема создается и меняется только миграциями (alembic upgrade head),
+# при старте лишь проверяем, что БД на актуальной ревизии. Миграции написаны для
+# PostgreSQL, поэтому схема другой СУБД (SQLite) создается по моделям
+async def check_schema_version():
+    if not IS_POSTGRES:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        return
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    head = set(ScriptDirectory.from_config(config).get_heads())
+    async with async_engine.connect() as conn:
+        current = await conn.run_sync(lambda sync_conn: set(MigrationContext.configure(sync_conn).get_current_heads()))
+    if current != head:
+        raise RuntimeError(
+            f"Схема БД не актуальна (ревизия {', '.join(current) or 'отсутствует'}, "
+            f"ожидается {', '.join(head)}): выполните 'alembic upgrade head'"
+        )
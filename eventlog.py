@@ -0,0 +1,238 @@
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+import orjson
+from config import settings
+from metrics import Counter, request_stats
+
+WRITTEN = Counter("log_records_written_total", "Записи журнала событий, записанные в приемник")
+DROPPED = Counter("log_records_dropped_total", "Записи журнала событий, отброшенные при переполнении очереди")
+
+STOP = object()
+
+
+# Приемник журнала: получает пачку готовых строк
+class Sink:
+    def write(self, lines: list):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class StreamSink(Sink):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write(self, lines: list):
+        self.stream.write("".join(lines))
+        self.stream.flush()
+
+
+# Файл с ротацией по размеру и по времени: app.log -> app.log.1 -> ... -> app.log.N
+class FileSink(Sink):
+    def __init__(self, path: str, max_bytes: int, interval: float, backups: int):
+        self.path = Path(path.format(pid=os.getpid()))
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backups = backups
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.size = self.file.tell()
+        self.opened_at = time.time()
+
+    def _rotate(self):
+        self.file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._open()
+
+    def write(self, lines: list):
+        data = "".join(lines)
+        size = len(data.encode())
+        if self.size and (self.max_bytes and self.size + size > self.max_bytes
+                          or self.interval and time.time() - self.opened_at >= self.interval):
+            self._rotate()
+        self.file.write(data)
+        self.file.flush()
+        self.size += size
+
+    def close(self):
+        self.file.close()
+
+
+class NullSink(Sink):
+    def write(self, lines: list):
+        pass
+
+
+sinks = {
+    "file": lambda: FileSink(settings.LOG_PATH, settings.LOG_MAX_BYTES, settings.LOG_ROTATE_INTERVAL,
+                             settings.LOG_BACKUP_COUNT),
+    "stdout": StreamSink,
+    "none": NullSink,
+}
+
+
+def register_sink(name: str, factory):
+    sinks[name] = factory
+
+
+# Журнал событий в формате JSON Lines. emit только кладет запись в ограниченную
+# очередь и никогда не блокирует обработчик запроса: сериализация, запись и
+# ротация выполняются фоновым потоком пачками
+class EventLog:
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        self.thread = None
+        self.sink = None
+
+    def emit(self, event: str, **fields):
+        record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": event, **fields}
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.sink = sinks[settings.LOG_SINK]()
+        self.thread = threading.Thread(target=self._run, name="eventlog-writer", daemon=True)
+        self.thread.start()
+
+    # Остановка не блокирует цикл событий дольше LOG_STOP_TIMEOUT: при полной очереди
+    # место для STOP освобождается за счет самой старой записи, а зависший на вводе-выводе
+    # поток бросается (он фоновый и завершится вместе с процессом)
+    def stop(self):
+        if self.thread is None:
+            return
+        while True:
+            try:
+                self.queue.put_nowait(STOP)
+                break
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    DROPPED.inc()
+                except queue.Empty:
+                    pass
+        self.thread.join(settings.LOG_STOP_TIMEOUT)
+        if self.thread.is_alive():
+            print("Журнал событий не записан до остановки", file=sys.stderr)
+        else:
+            self.sink.close()
+        self.thread = None
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + settings.LOG_FLUSH_INTERVAL
+            while batch[-1] is not STOP and len(batch) < settings.LOG_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is STOP
+            if stop:
+                batch.pop()
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: list):
+        lines = [orjson.dumps(record, default=str, option=orjson.OPT_APPEND_NEWLINE).decode() for record in batch]
+        try:
+            self.sink.write(lines)
+            WRITTEN.inc(amount=len(lines))
+        except Exception as e:
+            DROPPED.inc(amount=len(lines))
+            print(f"Ошибка записи журнала событий: {e!r}", file=sys.stderr)
+
+
+# Записи стандартного logging (логгеры tutorhelper.*) попадают в тот же журнал
+class EventLogHandler(logging.Handler):
+    def __init__(self, log: EventLog):
+        super().__init__()
+        self.log = log
+
+    def emit(self, record: logging.LogRecord):
+        fields = {"level": record.levelname.lower(), "logger": record.name, "message": record.getMessage()}
+        stats = request_stats.get()
+        if stats is not None:
+            fields["request_id"] = stats.request_id
+        if record.exc_info:
+            fields["exception"] = logging.Formatter().formatException(record.exc_info)
+        self.log.emit("log", **fields)
+
+
+# Журнал доступа: одна запись на HTTP-запрос. Подключается внутри MetricsMiddleware
+# и берет число SQL-запросов и время в БД из его RequestStats
+class AccessLogMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ACCESS_LOG:
+            return await self.app(scope, receive, send)
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        stats = request_stats.get()
+        if stats is not None:
+            stats.request_id = request_id
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", ())) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            event_log.emit(
+                "http.request",
+                request_id=request_id,
+                method=scope["method"],
+                path=scope["path"],
+                route=route.path_format if route is not None else None,
+                status=status,
+                duration_ms=round((time.perf_counter() - start) * 1000, 2),
+                db_queries=stats.queries if stats is not None else None,
+                db_ms=round(stats.db_time * 1000, 2) if stats is not None else None,
+                client=scope["client"][0] if scope.get("client") else None,
+            )
+
+
+event_log = EventLog()
+
+
+def setup_logging():
+    event_log.start()
+    logger = logging.getLogger("tutorhelper")
+    if not any(isinstance(handler, EventLogHandler) for handler in logger.handlers):
+        logger.addHandler(EventLogHandler(event_log))
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
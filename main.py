@@ -1,12 +1,40 @@
+import os
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from public.crud import router
-from database import create_async_tables, init_db
-from datetime import datetime
+from public.bulk import router as bulk_router
+from public.export import router as export_router
+from public.calendar import router as calendar_router
+from public.overview import router as overview_router
+from public.realtime import router as realtime_router
+from public.search import router as search_router
+from public.availability import router as availability_router
+from public.stats import router as stats_router
+from database import IS_POSTGRES, check_schema_version, dispose_engines
+from security import reload_revoked_tokens, revocation_poller, shutdown_hash_executor
+from notifier import notifier
+from pubsub import hub
+from partitions import maintainer
+from aggregates import refresher
+from config import settings
+from cache import entity_cache
+from metrics import MetricsMiddleware, render as render_metrics
+from eventlog import AccessLogMiddleware, event_log, setup_logging
 
 app = FastAPI()
 app.include_router(router, prefix="/api/v1")
+app.include_router(bulk_router, prefix="/api/v1")
+app.include_router(export_router, prefix="/api/v1")
+app.include_router(calendar_router, prefix="/api/v1")
+app.include_router(overview_router, prefix="/api/v1")
+app.include_router(availability_router, prefix="/api/v1")
+# Полнотекстовый поиск, LISTEN/NOTIFY и статистика на триггерах требуют PostgreSQL
+if IS_POSTGRES:
+    app.include_router(realtime_router, prefix="/api/v1")
+    app.include_router(search_router, prefix="/api/v1")
+    app.include_router(stats_router, prefix="/api/v1")
 
 
 # Middleware для CORS
@@ -16,24 +44,66 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Estimate", "X-Request-ID"],
 )
+app.add_middleware(AccessLogMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 @app.on_event("startup")
 async def startup_event():
-    await init_db()
-    await create_async_tables()
-    with open("log.txt", mode="a") as f:
-        f.write(f"Приложение запущено: {datetime.now()}\n")
+    setup_logging()
+    if settings.STARTUP_CHECKS:
+        await check_schema_version()
+    # Отзывы токенов, сделанные до запуска процесса, в том числе другими воркерами
+    await reload_revoked_tokens()
+    if settings.NOTIFY_ENABLED:
+        await notifier.start()
+    # Соединение LISTEN также доставляет воркеру сбросы кэша и отзывы токенов
+    if settings.REALTIME_ENABLED or settings.CACHE_INVALIDATION_ENABLED:
+        await hub.start()
+    else:
+        await revocation_poller.start()
+    if settings.PARTITIONS_ENABLED:
+        await maintainer.start()
+    if settings.STATS_REFRESH_ENABLED:
+        await refresher.start()
+    event_log.emit("app.start", pid=os.getpid())
 
 
 @app.on_event("shutdown")
-def shutdown_event():
-     with open("log.txt", mode="a") as f:
-         f.write(f"Приложение остановлено: {datetime.now()}\n")
+async def shutdown_event():
+    if settings.NOTIFY_ENABLED:
+        await notifier.stop()
+    if settings.REALTIME_ENABLED or settings.CACHE_INVALIDATION_ENABLED:
+        await hub.stop()
+    else:
+        await revocation_poller.stop()
+    if settings.PARTITIONS_ENABLED:
+        await maintainer.stop()
+    if settings.STATS_REFRESH_ENABLED:
+        await refresher.stop()
+    shutdown_hash_executor()
+    await dispose_engines()
+    event_log.emit("app.stop", pid=os.getpid())
+    event_log.stop()
 
 @app.get("/")
 def index():
     return "Приложение запущено"
 
+@app.get("/cache/stats")
+def cache_stats():
+    return entity_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    stats = entity_cache.stats()
+    lines = ["# TYPE cache_hits_total counter"]
+    lines += [f'cache_hits_total{{entity="{entity}"}} {count}' for entity, count in stats["hits"].items()]
+    lines.append("# TYPE cache_misses_total counter")
+    lines += [f'cache_misses_total{{entity="{entity}"}} {count}' for entity, count in stats["misses"].items()]
+    lines += ["# TYPE cache_entries gauge", f"cache_entries {stats['size']}"]
+    return PlainTextResponse(render_metrics(lines), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -0,0 +1,205 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from config import settings
+
+slow_log = logging.getLogger("tutorhelper.slow")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# Минимальная реализация метрик в текстовом формате Prometheus
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self.values = {}
+        registry.append(self)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {v}" for k, v in self.values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value: float):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def render(self) -> list:
+        lines = self.header()
+        names = self.label_names + ("le",)
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("+Inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("+Inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+registry = []
+pools = {}
+
+REQUESTS = Counter("http_requests_total", "Число HTTP-запросов", ("method", "route", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "Длительность обработки запроса", ("method", "route"))
+IN_PROGRESS = Gauge("http_requests_in_progress", "Запросы в обработке")
+DB_QUERIES = Counter("db_queries_total", "Число SQL-запросов")
+DB_LATENCY = Histogram("db_query_duration_seconds", "Длительность SQL-запроса")
+REQUEST_QUERIES = Histogram("http_request_db_queries", "Число SQL-запросов на HTTP-запрос", ("route",),
+                            buckets=COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Время в БД на HTTP-запрос", ("route",))
+POOL_WAIT = Histogram("db_pool_checkout_wait_seconds", "Ожидание соединения из пула", ("pool",))
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "statements", "request_id")
+
+    def __init__(self):
+        self.request_id = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = [] if settings.SLOW_REQUEST_MS else None
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+# Пул, измеряющий время ожидания свободного соединения
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(getattr(self, "metrics_name", "primary"), value=time.perf_counter() - start)
+
+
+def instrument_engine(engine, name: str = "primary"):
+    sync_engine = engine.sync_engine
+    sync_engine.pool.metrics_name = name
+    pools[name] = sync_engine.pool
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERIES.inc()
+        DB_LATENCY.observe(value=elapsed)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            if stats.statements is not None:
+                stats.statements.append((round(elapsed * 1000, 2), statement[:500]))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            IN_PROGRESS.dec()
+            request_stats.reset(token)
+            route = scope.get("route")
+            route = route.path_format if route is not None else "unmatched"
+            REQUESTS.inc(scope["method"], route, status)
+            LATENCY.observe(scope["method"], route, value=duration)
+            REQUEST_QUERIES.observe(route, value=stats.queries)
+            REQUEST_DB_TIME.observe(route, value=stats.db_time)
+            if settings.SLOW_REQUEST_MS and duration * 1000 >= settings.SLOW_REQUEST_MS:
+                slow_log.warning(
+                    "Медленный запрос %s %s: %.1f мс, SQL-запросов %d (%.1f мс)\n%s",
+                    scope["method"], scope["path"], duration * 1000, stats.queries, stats.db_time * 1000,
+                    "\n".join(f"  [{ms} мс] {sql}" for ms, sql in stats.statements),
+                )
+
+
+def render(extra: list = ()) -> str:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    for gauge, read, description in (
+        ("db_pool_size", lambda p: p.size(), "Размер пула соединений"),
+        ("db_pool_checked_out", lambda p: p.checkedout(), "Выданные из пула соединения"),
+        # overflow() отрицателен, пока пул не заполнен (-pool_size у пустого пула)
+        ("db_pool_overflow", lambda p: max(p.overflow(), 0), "Соединения сверх размера пула"),
+    ):
+        lines += [f"# HELP {gauge} {description}", f"# TYPE {gauge} gauge"]
+        lines += [f"{gauge}{_labels(('pool',), (name,))} {read(pool)}" for name, pool in pools.items()]
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
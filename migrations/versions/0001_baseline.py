@@ -0,0 +1,96 @@
+"""Исходная схема (как ее создавал create_all)
+
+База, созданная прежним create_all при старте приложения, принимается как есть:
+если все таблицы исходной схемы уже существуют, ревизия ничего не создает и просто
+отмечается примененной (то же, что 'alembic stamp 0001'); дальше 'alembic upgrade head'
+применяет остальные миграции. Если таблиц только часть, миграция останавливается -
+такую базу нужно привести в порядок вручную.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLES = ["student", "tutor", "place", "schedule", "notification", "journal_entry"]
+
+
+def upgrade():
+    # В режиме --sql базы нет: выводится полная схема
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names()) & set(TABLES)
+    if existing == set(TABLES):
+        return
+    if existing:
+        raise RuntimeError(
+            f"В БД есть только часть таблиц исходной схемы ({', '.join(sorted(existing))}): "
+            f"создайте недостающие или восстановите базу, затем повторите 'alembic upgrade head'"
+        )
+    op.create_table(
+        "student",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("lastname", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("student_class", sa.String(), nullable=False),
+        sa.Column("school", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("password", sa.String(), nullable=False),
+    )
+    op.create_index("ix_student_lastname", "student", ["lastname"])
+    op.create_table(
+        "tutor",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("lastname", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("password", sa.String(), nullable=False),
+    )
+    op.create_index("ix_tutor_lastname", "tutor", ["lastname"])
+    op.create_table(
+        "place",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("address", sa.String(), nullable=False),
+    )
+    op.create_index("ix_place_name", "place", ["name"])
+    op.create_table(
+        "schedule",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("date", sa.String(), nullable=False),
+        sa.Column("time", sa.String(), nullable=False),
+        sa.Column("student_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("student.id")),
+        sa.Column("tutor_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tutor.id")),
+        sa.Column("place_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("place.id")),
+    )
+    op.create_table(
+        "notification",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("message", sa.String(), nullable=False),
+        sa.Column("student_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("student.id")),
+        sa.Column("schedule_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("schedule.id")),
+    )
+    op.create_table(
+        "journal_entry",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("date", sa.String(), nullable=False),
+        sa.Column("content", sa.String(), nullable=False),
+        sa.Column("student_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("student.id")),
+    )
+
+
+def downgrade():
+    op.drop_table("journal_entry")
+    op.drop_table("notification")
+    op.drop_table("schedule")
+    op.drop_table("place")
+    op.drop_table("tutor")
+    op.drop_table("student")
@@ -0,0 +1,58 @@
+"""Уникальные username и индексы на внешние ключи
+
+create_all уникальность username не проверял, поэтому перед созданием уникальных
+индексов миграция ищет повторы и, если они есть, останавливается со списком логинов:
+их нужно переименовать (или удалить лишние записи) и повторить 'alembic upgrade head'.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = [
+    ("schedule", "student_id"),
+    ("schedule", "tutor_id"),
+    ("schedule", "place_id"),
+    ("notification", "student_id"),
+    ("notification", "schedule_id"),
+    ("journal_entry", "student_id"),
+]
+
+
+def check_duplicates(table: str):
+    if context.is_offline_mode():
+        return
+    duplicates = op.get_bind().execute(sa.text(
+        f"SELECT username, count(*) FROM {table} GROUP BY username HAVING count(*) > 1 ORDER BY username"
+    )).all()
+    if duplicates:
+        listed = ", ".join(f"{username!r} ({count})" for username, count in duplicates[:20])
+        raise RuntimeError(
+            f"Повторяющиеся username в {table}: {listed}"
+            f"{' и другие' if len(duplicates) > 20 else ''}. "
+            f"Переименуйте их, затем повторите 'alembic upgrade head'"
+        )
+
+
+def upgrade():
+    check_duplicates("student")
+    check_duplicates("tutor")
+    op.create_index("ix_student_username", "student", ["username"], unique=True)
+    op.create_index("ix_tutor_username", "tutor", ["username"], unique=True)
+    for table, column in FOREIGN_KEYS:
+        op.create_index(f"ix_{table}_{column}", table, [column])
+
+
+def downgrade():
+    for table, column in FOREIGN_KEYS:
+        op.drop_index(f"ix_{table}_{column}", table)
+    op.drop_index("ix_tutor_username", "tutor")
+    op.drop_index("ix_student_username", "student")
@@ -0,0 +1,33 @@
+"""Типизированные дата/время занятий и журнала, индексы календаря
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Значения, которые не приводятся к дате/времени, прервут миграцию:
+    # их нужно исправить вручную до обновления
+    op.execute("ALTER TABLE schedule ALTER COLUMN date TYPE DATE USING trim(date)::date")
+    op.execute("ALTER TABLE schedule ALTER COLUMN time TYPE TIME USING trim(time)::time")
+    op.execute("ALTER TABLE journal_entry ALTER COLUMN date TYPE DATE USING trim(date)::date")
+    op.create_index("ix_schedule_tutor_id_date_time", "schedule", ["tutor_id", "date", "time"])
+    op.create_index("ix_schedule_student_id_date_time", "schedule", ["student_id", "date", "time"])
+    op.create_index("ix_journal_entry_student_id_date", "journal_entry", ["student_id", "date"])
+
+
+def downgrade():
+    op.drop_index("ix_journal_entry_student_id_date", "journal_entry")
+    op.drop_index("ix_schedule_student_id_date_time", "schedule")
+    op.drop_index("ix_schedule_tutor_id_date_time", "schedule")
+    op.execute("ALTER TABLE journal_entry ALTER COLUMN date TYPE VARCHAR USING date::text")
+    op.execute("ALTER TABLE schedule ALTER COLUMN time TYPE VARCHAR USING time::text")
+    op.execute("ALTER TABLE schedule ALTER COLUMN date TYPE VARCHAR USING date::text")
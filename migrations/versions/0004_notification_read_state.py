@@ -0,0 +1,28 @@
+"""Признак прочтения и время создания уведомлений
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("notification", sa.Column("is_read", sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column("notification", sa.Column("created_at", sa.DateTime(timezone=True), nullable=False,
+                                            server_default=sa.func.now()))
+    op.create_index("ix_notification_student_id_unread", "notification", ["student_id", "created_at"],
+                    postgresql_where=sa.text("NOT is_read"))
+
+
+def downgrade():
+    op.drop_index("ix_notification_student_id_unread", "notification")
+    op.drop_column("notification", "created_at")
+    op.drop_column("notification", "is_read")
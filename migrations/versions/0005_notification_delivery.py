@@ -0,0 +1,37 @@
+"""Состояние доставки уведомлений
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("notification", sa.Column("kind", sa.String(), nullable=False, server_default="manual"))
+    op.add_column("notification", sa.Column("status", sa.String(), nullable=False, server_default="pending"))
+    op.add_column("notification", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("notification", sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False,
+                                            server_default=sa.func.now()))
+    op.add_column("notification", sa.Column("sent_at", sa.DateTime(timezone=True)))
+    op.add_column("notification", sa.Column("last_error", sa.String()))
+    # Уведомления, созданные до появления доставки, повторно не рассылаем
+    op.execute("UPDATE notification SET status = 'skipped'")
+    op.create_index("ix_notification_due", "notification", ["next_attempt_at"],
+                    postgresql_where=sa.text("status IN ('pending', 'sending')"))
+    op.create_index("ux_notification_reminder", "notification", ["schedule_id"], unique=True,
+                    postgresql_where=sa.text("kind = 'reminder'"))
+
+
+def downgrade():
+    op.drop_index("ux_notification_reminder", "notification")
+    op.drop_index("ix_notification_due", "notification")
+    for column in ("last_error", "sent_at", "next_attempt_at", "attempts", "status", "kind"):
+        op.drop_column("notification", column)
@@ -0,0 +1,47 @@
+"""Оповещение о новых уведомлениях через LISTEN/NOTIFY
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Триггер уровня выражения: массовая вставка (COPY, INSERT ... SELECT) вызывает
+    # функцию один раз. Полезная нагрузка NOTIFY ограничена 8000 байт, поэтому
+    # длинные сообщения не передаются - подписчики дочитывают их из таблицы
+    op.execute("""
+        CREATE FUNCTION notification_notify() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('notification', CASE WHEN octet_length(payload) < 7900 THEN payload
+                                                   ELSE json_build_object('id', id, 'student_id', student_id)::text END)
+            FROM (
+                SELECT id, student_id,
+                       json_build_object('id', id, 'message', message, 'student_id', student_id,
+                                         'schedule_id', schedule_id, 'kind', kind, 'created_at', created_at)::text AS payload
+                FROM inserted
+                WHERE student_id IS NOT NULL
+            ) AS rows;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER notification_notify AFTER INSERT ON notification
+        REFERENCING NEW TABLE AS inserted FOR EACH STATEMENT EXECUTE FUNCTION notification_notify()
+    """)
+    # Досылка пропущенного при переподключении: (student_id, created_at, id) > последнего полученного
+    op.create_index("ix_notification_student_id_created_at", "notification", ["student_id", "created_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_notification_student_id_created_at", "notification")
+    op.execute("DROP TRIGGER notification_notify ON notification")
+    op.execute("DROP FUNCTION notification_notify()")
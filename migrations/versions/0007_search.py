@@ -0,0 +1,39 @@
+"""Полнотекстовый поиск по журналу и нечеткий поиск по фамилиям и местам
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ("ix_student_lastname_trgm", "student", "lastname"),
+    ("ix_tutor_lastname_trgm", "tutor", "lastname"),
+    ("ix_place_name_trgm", "place", "name"),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Вычисляемый столбец не описан в модели: его заполняет БД при любой вставке, включая COPY
+    op.execute("""
+        ALTER TABLE journal_entry
+        ADD COLUMN content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('russian', content)) STORED
+    """)
+    op.execute("CREATE INDEX ix_journal_entry_content_tsv ON journal_entry USING gin (content_tsv)")
+    # Триграммные индексы обслуживают и похожесть (%), и ILIKE 'префикс%'
+    for name, table, column in TRIGRAM_INDEXES:
+        op.execute(f"CREATE INDEX {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def downgrade():
+    for name, table, column in TRIGRAM_INDEXES:
+        op.drop_index(name, table)
+    op.drop_index("ix_journal_entry_content_tsv", "journal_entry")
+    op.drop_column("journal_entry", "content_tsv")
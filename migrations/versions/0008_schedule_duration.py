@@ -0,0 +1,26 @@
+"""Длительность занятий и индекс занятости мест
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("schedule", sa.Column("duration_minutes", sa.Integer(), nullable=False, server_default="60"))
+    op.create_check_constraint("ck_schedule_duration_minutes", "schedule", "duration_minutes BETWEEN 1 AND 1440")
+    op.create_index("ix_schedule_place_id_date_time", "schedule", ["place_id", "date", "time"])
+
+
+def downgrade():
+    op.drop_index("ix_schedule_place_id_date_time", "schedule")
+    op.drop_constraint("ck_schedule_duration_minutes", "schedule")
+    op.drop_column("schedule", "duration_minutes")
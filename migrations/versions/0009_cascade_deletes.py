@@ -0,0 +1,38 @@
+"""Каскадное удаление зависимых записей на стороне БД
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# (таблица, столбец, связанная таблица, правило удаления)
+FOREIGN_KEYS = [
+    ("schedule", "student_id", "student", "CASCADE"),
+    ("schedule", "tutor_id", "tutor", "CASCADE"),
+    ("schedule", "place_id", "place", "SET NULL"),
+    ("notification", "student_id", "student", "CASCADE"),
+    ("notification", "schedule_id", "schedule", "CASCADE"),
+    ("journal_entry", "student_id", "student", "CASCADE"),
+]
+
+
+def recreate(ondelete: bool):
+    for table, column, referent, rule in FOREIGN_KEYS:
+        name = f"{table}_{column}_fkey"
+        op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(name, table, referent, [column], ["id"], ondelete=rule if ondelete else None)
+
+
+def upgrade():
+    recreate(ondelete=True)
+
+
+def downgrade():
+    recreate(ondelete=False)
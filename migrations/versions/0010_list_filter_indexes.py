@@ -0,0 +1,25 @@
+"""Индексы для фильтров списков по датам
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_schedule_date", "schedule", ["date"])
+    op.create_index("ix_notification_created_at", "notification", ["created_at"])
+    op.create_index("ix_journal_entry_date", "journal_entry", ["date"])
+
+
+def downgrade():
+    op.drop_index("ix_journal_entry_date", "journal_entry")
+    op.drop_index("ix_notification_created_at", "notification")
+    op.drop_index("ix_schedule_date", "schedule")
@@ -0,0 +1,141 @@
+"""Помесячное секционирование уведомлений и журнала
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+
+"""
+import datetime as dt
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+# Секции создаются заранее на столько месяцев вперед; дальше их создает partitions.py
+MONTHS_AHEAD = 3
+
+NOTIFICATION_COLUMNS = """
+    id uuid NOT NULL,
+    message varchar NOT NULL,
+    student_id uuid CONSTRAINT notification_student_id_fkey REFERENCES student (id) ON DELETE CASCADE,
+    schedule_id uuid CONSTRAINT notification_schedule_id_fkey REFERENCES schedule (id) ON DELETE CASCADE,
+    is_read boolean NOT NULL DEFAULT false,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    kind varchar NOT NULL DEFAULT 'manual',
+    status varchar NOT NULL DEFAULT 'pending',
+    attempts integer NOT NULL DEFAULT 0,
+    next_attempt_at timestamptz NOT NULL DEFAULT now(),
+    sent_at timestamptz,
+    last_error varchar
+"""
+JOURNAL_COLUMNS = """
+    id uuid NOT NULL,
+    date date NOT NULL,
+    content varchar NOT NULL,
+    student_id uuid CONSTRAINT journal_entry_student_id_fkey REFERENCES student (id) ON DELETE CASCADE,
+    content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('russian', content)) STORED
+"""
+
+# (таблица, столбцы, ключ секционирования, копируемые столбцы)
+TABLES = [
+    ("notification", NOTIFICATION_COLUMNS, "created_at",
+     "id, message, student_id, schedule_id, is_read, created_at, kind, status, attempts, next_attempt_at, "
+     "sent_at, last_error"),
+    ("journal_entry", JOURNAL_COLUMNS, "date", "id, date, content, student_id"),
+]
+
+# Индексы без учета первичного ключа; ux_notification_reminder в секционированной таблице
+# не может быть уникальным (уникальный индекс обязан включать created_at)
+NOTIFICATION_INDEXES = [
+    ("ix_notification_student_id", ["student_id"], None),
+    ("ix_notification_schedule_id", ["schedule_id"], None),
+    ("ix_notification_created_at", ["created_at"], None),
+    ("ix_notification_student_id_created_at", ["student_id", "created_at", "id"], None),
+    ("ix_notification_student_id_unread", ["student_id", "created_at"], "NOT is_read"),
+    ("ix_notification_due", ["next_attempt_at"], "status IN ('pending', 'sending')"),
+]
+JOURNAL_INDEXES = [
+    ("ix_journal_entry_student_id", ["student_id"], None),
+    ("ix_journal_entry_date", ["date"], None),
+    ("ix_journal_entry_student_id_date", ["student_id", "date"], None),
+]
+
+
+def month_bound(table: str, month: dt.date) -> str:
+    # Границы секций уведомлений - по UTC, независимо от часового пояса сеанса
+    return f"'{month.isoformat()} 00:00:00+00'" if table == "notification" else f"'{month.isoformat()}'"
+
+
+def next_month(month: dt.date) -> dt.date:
+    return (month + dt.timedelta(days=32)).replace(day=1)
+
+
+def create_partitions(table: str, key: str, source: str):
+    # Секция на каждый месяц, в котором есть данные, и на текущий месяц с MONTHS_AHEAD следующими;
+    # остальное (например, даты с опечаткой в году) попадает в секцию по умолчанию
+    bind = op.get_bind()
+    months = set(bind.execute(sa.text(
+        f"SELECT DISTINCT date_trunc('month', {key} AT TIME ZONE 'UTC')::date FROM {source}"
+        if table == "notification" else
+        f"SELECT DISTINCT date_trunc('month', {key})::date FROM {source}"
+    )).scalars())
+    month = dt.date.today().replace(day=1)
+    for _ in range(MONTHS_AHEAD + 1):
+        months.add(month)
+        month = next_month(month)
+    for month in sorted(months):
+        op.execute(f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} "
+                   f"FOR VALUES FROM ({month_bound(table, month)}) TO ({month_bound(table, next_month(month))})")
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def rebuild(table: str, columns: str, key: str, copied: str, partitioned: bool):
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    op.execute(f"ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey")
+    if partitioned:
+        op.execute(f"CREATE TABLE {table} ({columns}, PRIMARY KEY (id, {key})) PARTITION BY RANGE ({key})")
+        create_partitions(table, key, f"{table}_old")
+    else:
+        op.execute(f"CREATE TABLE {table} ({columns}, PRIMARY KEY (id))")
+    op.execute(f"INSERT INTO {table} ({copied}) SELECT {copied} FROM {table}_old")
+    # Вместе со старой таблицей удаляются ее индексы, триггер и секции
+    op.execute(f"DROP TABLE {table}_old")
+
+
+def create_indexes(partitioned: bool):
+    for name, columns, where in NOTIFICATION_INDEXES:
+        op.create_index(name, "notification", columns, postgresql_where=sa.text(where) if where else None)
+    if partitioned:
+        # Поиск уже созданного напоминания (notifier.reminders_statement)
+        op.create_index("ix_notification_reminder", "notification", ["schedule_id", "created_at"],
+                        postgresql_where=sa.text("kind = 'reminder'"))
+    else:
+        op.create_index("ux_notification_reminder", "notification", ["schedule_id"], unique=True,
+                        postgresql_where=sa.text("kind = 'reminder'"))
+    for name, columns, where in JOURNAL_INDEXES:
+        op.create_index(name, "journal_entry", columns)
+    op.execute("CREATE INDEX ix_journal_entry_content_tsv ON journal_entry USING gin (content_tsv)")
+    # Триггер уровня выражения на секционированной таблице получает все строки вставки,
+    # в какие бы секции они ни попали
+    op.execute("""
+        CREATE TRIGGER notification_notify AFTER INSERT ON notification
+        REFERENCING NEW TABLE AS inserted FOR EACH STATEMENT EXECUTE FUNCTION notification_notify()
+    """)
+
+
+def upgrade():
+    # Старые секции уведомлений отсоединяются и переносятся сюда (partitions.py)
+    op.execute("CREATE SCHEMA IF NOT EXISTS archive")
+    for table, columns, key, copied in TABLES:
+        rebuild(table, columns, key, copied, partitioned=True)
+    create_indexes(partitioned=True)
+
+
+def downgrade():
+    # Отсоединенные архивные секции остаются в схеме archive
+    for table, columns, key, copied in TABLES:
+        rebuild(table, columns, key, copied, partitioned=False)
+    create_indexes(partitioned=False)
@@ -0,0 +1,147 @@
+"""Предагрегированная статистика занятий и журнала
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+MONTH = "date_trunc('month', date)::date"
+LESSONS = {"lessons": "sign", "lesson_minutes": "sign * duration_minutes"}
+
+# Счетчики таблицы статистики: (таблица, ключ - выражение над строкой, значения - выражение с sign)
+ROLLUPS = {
+    "schedule": [
+        ("student_monthly_stats", {"student_id": "student_id", "month": MONTH}, LESSONS),
+        ("tutor_monthly_stats", {"tutor_id": "tutor_id", "month": MONTH}, LESSONS),
+        ("place_monthly_stats", {"place_id": "place_id", "month": MONTH}, LESSONS),
+        ("tutor_student_stats", {"tutor_id": "tutor_id", "student_id": "student_id"}, LESSONS),
+    ],
+    "journal_entry": [
+        ("student_monthly_stats", {"student_id": "student_id", "month": MONTH}, {"journal_entries": "sign"}),
+    ],
+}
+COUNTERS = {
+    "student_monthly_stats": ["lessons", "lesson_minutes", "journal_entries"],
+    "tutor_monthly_stats": ["lessons", "lesson_minutes"],
+    "place_monthly_stats": ["lessons", "lesson_minutes"],
+    "tutor_student_stats": ["lessons", "lesson_minutes"],
+}
+SOURCES = {
+    "INSERT": "SELECT n.*, 1 AS sign FROM new_rows n",
+    "DELETE": "SELECT o.*, -1 AS sign FROM old_rows o",
+    "UPDATE": "SELECT n.*, 1 AS sign FROM new_rows n UNION ALL SELECT o.*, -1 AS sign FROM old_rows o",
+}
+
+
+# Изменение строк превращается в приращения счетчиков, сгруппированные по ключу;
+# ORDER BY задает одинаковый порядок блокировок строк статистики во всех транзакциях
+def upsert(table: str, keys: dict, values: dict, source: str) -> str:
+    key_columns = ", ".join(keys)
+    not_null = " AND ".join(f"{expr} IS NOT NULL" for expr in keys.values())
+    sums = ", ".join(f"sum({expr})" for expr in values.values())
+    changed = " OR ".join(f"sum({expr}) <> 0" for expr in values.values())
+    updates = ", ".join(f"{column} = s.{column} + excluded.{column}" for column in values)
+    positions = ", ".join(str(i + 1) for i in range(len(keys)))
+    return f"""
+        INSERT INTO {table} AS s ({key_columns}, {", ".join(values)})
+        SELECT {", ".join(keys.values())}, {sums} FROM ({source}) d WHERE {not_null}
+        GROUP BY {positions} HAVING {changed} ORDER BY {positions}
+        ON CONFLICT ({key_columns}) DO UPDATE SET {updates}"""
+
+
+# Строки, у которых все счетчики обнулились (например, после удаления ученика), удаляются
+def cleanup(table: str, keys: dict, source: str) -> str:
+    zero = " AND ".join(f"{column} = 0" for column in COUNTERS[table])
+    return f"""
+        DELETE FROM {table} WHERE ({", ".join(keys)}) IN (SELECT {", ".join(keys.values())} FROM ({source}) d)
+        AND {zero}"""
+
+
+def trigger_function(table: str) -> str:
+    branches = []
+    for operation, source in SOURCES.items():
+        statements = [upsert(name, keys, values, source) for name, keys, values in ROLLUPS[table]]
+        if operation != "INSERT":
+            statements += [cleanup(name, keys, source) for name, keys, values in ROLLUPS[table]]
+        branches.append(f"TG_OP = '{operation}' THEN" + ";".join(statements) + ";")
+    return f"""
+        CREATE FUNCTION {table}_stats() RETURNS trigger AS $$
+        BEGIN
+            IF {" ELSIF ".join(branches)}
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql"""
+
+
+def counters(*names: str) -> list:
+    return [sa.Column(name, sa.Integer(), nullable=False, server_default="0") for name in names]
+
+
+def upgrade():
+    uuid = postgresql.UUID(as_uuid=True)
+    op.create_table("student_monthly_stats", sa.Column("student_id", uuid, primary_key=True),
+                    sa.Column("month", sa.Date(), primary_key=True), *counters(*COUNTERS["student_monthly_stats"]))
+    op.create_table("tutor_monthly_stats", sa.Column("tutor_id", uuid, primary_key=True),
+                    sa.Column("month", sa.Date(), primary_key=True), *counters(*COUNTERS["tutor_monthly_stats"]))
+    op.create_table("place_monthly_stats", sa.Column("place_id", uuid, primary_key=True),
+                    sa.Column("month", sa.Date(), primary_key=True), *counters(*COUNTERS["place_monthly_stats"]))
+    op.create_table("tutor_student_stats", sa.Column("tutor_id", uuid, primary_key=True),
+                    sa.Column("student_id", uuid, primary_key=True), *counters(*COUNTERS["tutor_student_stats"]))
+
+    # Триггеры уровня выражения: массовая вставка, COPY и каскадное удаление обновляют
+    # статистику одним запросом на таблицу, а не на каждую строку. Триггеры создаются до
+    # начального заполнения: записи в schedule и journal_entry ждут конца миграции
+    for table in ROLLUPS:
+        op.execute(trigger_function(table))
+        for operation, references in (("INSERT", "NEW TABLE AS new_rows"), ("DELETE", "OLD TABLE AS old_rows"),
+                                      ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows")):
+            op.execute(f"""
+                CREATE TRIGGER {table}_stats_{operation.lower()} AFTER {operation} ON {table}
+                REFERENCING {references} FOR EACH STATEMENT EXECUTE FUNCTION {table}_stats()
+            """)
+    for table, rollups in ROLLUPS.items():
+        for name, keys, values in rollups:
+            op.execute(upsert(name, keys, values, f"SELECT t.*, 1 AS sign FROM {table} t"))
+
+    # Серии посещений: подряд идущие недели, в которые у ученика есть запись в журнале.
+    # Инкрементально не считается - представление обновляется по расписанию (aggregates.py)
+    op.execute("""
+        CREATE MATERIALIZED VIEW student_streaks AS
+        WITH weeks AS (
+            SELECT DISTINCT student_id, date_trunc('week', date)::date AS week
+            FROM journal_entry WHERE student_id IS NOT NULL
+        ), runs AS (
+            SELECT student_id, week, week - 7 * row_number() OVER (PARTITION BY student_id ORDER BY week)::int AS run
+            FROM weeks
+        ), streaks AS (
+            SELECT student_id, count(*) AS weeks, max(week) AS last_week FROM runs GROUP BY student_id, run
+        )
+        SELECT student_id,
+               max(weeks)::int AS longest_streak,
+               coalesce(max(weeks) FILTER (WHERE last_week >= date_trunc('week', current_date)::date - 7), 0)::int
+                   AS current_streak,
+               max(last_week) AS last_week
+        FROM streaks GROUP BY student_id
+    """)
+    # Уникальный индекс нужен для REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX ux_student_streaks_student_id ON student_streaks (student_id)")
+
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW student_streaks")
+    for table in ROLLUPS:
+        for operation in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER {table}_stats_{operation} ON {table}")
+        op.execute(f"DROP FUNCTION {table}_stats()")
+    for table in COUNTERS:
+        op.drop_table(table)
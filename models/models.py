@@ -1,5 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, Integer, Date, DateTime, Time, ForeignKey, Index, CheckConstraint, Uuid, false, func, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
@@ -10,66 +9,154 @@ Base = declarative_base()
 class Student(Base):
     __tablename__ = "student"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     lastname = Column(String, index=True, nullable=False)
     name = Column(String, nullable=False)
     student_class = Column(String, nullable=False)
     school = Column(String, nullable=False)
     email = Column(String, nullable=False)
-    username = Column(String, nullable=False)
+    username = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
-    journal_entries = relationship("JournalEntry", back_populates="student")
-    notifications = relationship("Notification", back_populates="student")
-    schedules = relationship("Schedule", back_populates="student")
+    # Зависимые записи удаляет БД (ON DELETE CASCADE); passive_deletes не дает ORM
+    # загружать их перед удалением
+    journal_entries = relationship("JournalEntry", back_populates="student", cascade="all, delete-orphan",
+                                   passive_deletes=True)
+    notifications = relationship("Notification", back_populates="student", cascade="all, delete-orphan",
+                                 passive_deletes=True)
+    schedules = relationship("Schedule", back_populates="student", cascade="all, delete-orphan",
+                             passive_deletes=True)
 
 class Tutor(Base):
     __tablename__ = "tutor"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     lastname = Column(String, index=True, nullable=False)
     name = Column(String, nullable=False)
     email = Column(String, nullable=False)
-    username = Column(String, nullable=False)
+    username = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
-    schedules = relationship("Schedule", back_populates="tutor")
+    schedules = relationship("Schedule", back_populates="tutor", cascade="all, delete-orphan", passive_deletes=True)
 
 class Place(Base):
     __tablename__ = "place"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String, index=True, nullable=False)
     address = Column(String, nullable=False)
-    schedules = relationship("Schedule", back_populates="place")
+    # Занятия остаются без места (ON DELETE SET NULL)
+    schedules = relationship("Schedule", back_populates="place", passive_deletes=True)
 
 class Schedule(Base):
     __tablename__ = "schedule"
+    __table_args__ = (
+        # Календарь репетитора/ученика: выборка по диапазону дат
+        Index("ix_schedule_tutor_id_date_time", "tutor_id", "date", "time"),
+        Index("ix_schedule_student_id_date_time", "student_id", "date", "time"),
+        Index("ix_schedule_place_id_date_time", "place_id", "date", "time"),
+        # Фильтр списка по диапазону дат без владельца
+        Index("ix_schedule_date", "date"),
+        CheckConstraint("duration_minutes BETWEEN 1 AND 1440", name="ck_schedule_duration_minutes"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    date = Column(String, nullable=False)
-    time = Column(String, nullable=False)
-    student_id = Column(UUID(as_uuid=True), ForeignKey("student.id"))
-    tutor_id = Column(UUID(as_uuid=True), ForeignKey("tutor.id"))
-    place_id = Column(UUID(as_uuid=True), ForeignKey("place.id"))
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    date = Column(Date, nullable=False)
+    time = Column(Time, nullable=False)
+    duration_minutes = Column(Integer, nullable=False, default=60, server_default="60")
+    student_id = Column(Uuid, ForeignKey("student.id", ondelete="CASCADE"), index=True)
+    tutor_id = Column(Uuid, ForeignKey("tutor.id", ondelete="CASCADE"), index=True)
+    place_id = Column(Uuid, ForeignKey("place.id", ondelete="SET NULL"), index=True)
     student = relationship("Student", back_populates="schedules")
     tutor = relationship("Tutor", back_populates="schedules")
     place = relationship("Place", back_populates="schedules")
-    notifications = relationship("Notification", back_populates="schedule")
+    notifications = relationship("Notification", back_populates="schedule", cascade="all, delete-orphan",
+                                 passive_deletes=True)
 
 class Notification(Base):
     __tablename__ = "notification"
+    __table_args__ = (
+        # Непрочитанные уведомления ученика, новые первыми
+        Index("ix_notification_student_id_unread", "student_id", "created_at", postgresql_where=text("NOT is_read")),
+        Index("ix_notification_student_id_created_at", "student_id", "created_at", "id"),
+        Index("ix_notification_created_at", "created_at"),
+        # Очередь доставки: только недоставленные уведомления
+        Index("ix_notification_due", "next_attempt_at", postgresql_where=text("status IN ('pending', 'sending')")),
+        # Поиск уже созданного напоминания о занятии (уникальный индекс в секционированной
+        # таблице невозможен без created_at, повтор исключает генератор напоминаний)
+        Index("ix_notification_reminder", "schedule_id", "created_at", postgresql_where=text("kind = 'reminder'")),
+        # Помесячные секции по created_at (миграция 0011, обслуживание - partitions.py)
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     message = Column(String, nullable=False)
-    student_id = Column(UUID(as_uuid=True), ForeignKey("student.id"))
-    schedule_id = Column(UUID(as_uuid=True), ForeignKey("schedule.id"))
+    is_read = Column(Boolean, nullable=False, default=False, server_default=false())
+    # Ключ секционирования входит в первичный ключ
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
+    # Состояние доставки: pending -> sending -> sent | failed (skipped - созданы до появления
+    # доставки); значения по умолчанию задаются на стороне БД, так как COPY и INSERT ... SELECT
+    # обходят Python
+    kind = Column(String, nullable=False, server_default="manual")  # manual | reminder
+    status = Column(String, nullable=False, server_default="pending")
+    attempts = Column(Integer, nullable=False, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
+    last_error = Column(String)
+    student_id = Column(Uuid, ForeignKey("student.id", ondelete="CASCADE"), index=True)
+    schedule_id = Column(Uuid, ForeignKey("schedule.id", ondelete="CASCADE"), index=True)
     student = relationship("Student", back_populates="notifications")
     schedule = relationship("Schedule", back_populates="notifications")
 
 class JournalEntry(Base):
     __tablename__ = "journal_entry"
+    __table_args__ = (
+        Index("ix_journal_entry_student_id_date", "student_id", "date"),
+        Index("ix_journal_entry_date", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    date = Column(String, nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    date = Column(Date, primary_key=True, nullable=False)
     content = Column(String, nullable=False)
-    student_id = Column(UUID(as_uuid=True), ForeignKey("student.id"))
+    student_id = Column(Uuid, ForeignKey("student.id", ondelete="CASCADE"), index=True)
     student = relationship("Student", back_populates="journal_entries")
+
+# Статистика поддерживается триггерами БД (миграция 0012) и через API только читается
+class StudentMonthlyStats(Base):
+    __tablename__ = "student_monthly_stats"
+
+    student_id = Column(Uuid, primary_key=True)
+    month = Column(Date, primary_key=True)
+    lessons = Column(Integer, nullable=False, server_default="0")
+    lesson_minutes = Column(Integer, nullable=False, server_default="0")
+    journal_entries = Column(Integer, nullable=False, server_default="0")
+
+class TutorMonthlyStats(Base):
+    __tablename__ = "tutor_monthly_stats"
+
+    tutor_id = Column(Uuid, primary_key=True)
+    month = Column(Date, primary_key=True)
+    lessons = Column(Integer, nullable=False, server_default="0")
+    lesson_minutes = Column(Integer, nullable=False, server_default="0")
+
+class PlaceMonthlyStats(Base):
+    __tablename__ = "place_monthly_stats"
+
+    place_id = Column(Uuid, primary_key=True)
+    month = Column(Date, primary_key=True)
+    lessons = Column(Integer, nullable=False, server_default="0")
+    lesson_minutes = Column(Integer, nullable=False, server_default="0")
+
+class TutorStudentStats(Base):
+    __tablename__ = "tutor_student_stats"
+
+    tutor_id = Column(Uuid, primary_key=True)
+    student_id = Column(Uuid, primary_key=True)
+    lessons = Column(Integer, nullable=False, server_default="0")
+    lesson_minutes = Column(Integer, nullable=False, server_default="0")
+
+# Отозванные токены (выход, использованный refresh-токен); строка нужна до истечения токена
+class RevokedToken(Base):
+    __tablename__ = "revoked_token"
+
+    jti = Column(String, primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
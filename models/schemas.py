@@ -1,6 +1,16 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Any, List, Optional
 from uuid import UUID
+import datetime as dt
+
+class TokenResponse(BaseModel):
+    username: str
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class StudentCreate(BaseModel):
     lastname: str
@@ -73,26 +83,38 @@ class PlaceResponse(BaseModel):
         orm_mode = True
 
 class ScheduleCreate(BaseModel):
-    date: str
-    time: str
+    date: dt.date
+    time: dt.time
+    duration_minutes: int = Field(60, ge=1, le=24 * 60)
     student_id: UUID
     tutor_id: UUID
     place_id: UUID
 
 class ScheduleUpdate(BaseModel):
-    date: Optional[str] = None
-    time: Optional[str] = None
+    date: Optional[dt.date] = None
+    time: Optional[dt.time] = None
+    duration_minutes: Optional[int] = Field(None, ge=1, le=24 * 60)
     student_id: Optional[UUID] = None
     tutor_id: Optional[UUID] = None
     place_id: Optional[UUID] = None
 
+    # Поля можно не передавать, но не обнулять: без них не вычислить интервал занятия
+    @field_validator("date", "time", "duration_minutes")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("Поле не может быть null")
+        return value
+
 class ScheduleResponse(BaseModel):
     id: UUID
-    date: str
-    time: str
+    date: dt.date
+    time: dt.time
+    duration_minutes: int
     student_id: UUID
     tutor_id: UUID
-    place_id: UUID
+    # Удаление места не удаляет занятия, а обнуляет ссылку (ON DELETE SET NULL)
+    place_id: Optional[UUID]
 
     class Config:
         orm_mode = True
@@ -106,31 +128,127 @@ class NotificationUpdate(BaseModel):
     message: Optional[str] = None
     student_id: Optional[UUID] = None
     schedule_id: Optional[UUID] = None
+    is_read: Optional[bool] = None
 
 class NotificationResponse(BaseModel):
     id: UUID
     message: str
     student_id: UUID
     schedule_id: UUID
+    is_read: bool
+    created_at: dt.datetime
+    kind: str
+    status: str
+    attempts: int
+    sent_at: Optional[dt.datetime]
+    last_error: Optional[str]
 
     class Config:
         orm_mode = True
 
 class JournalEntryCreate(BaseModel):
-    date: str
+    date: dt.date
     content: str
     student_id: UUID
 
 class JournalEntryUpdate(BaseModel):
-    date: Optional[str] = None
+    date: Optional[dt.date] = None
     content: Optional[str] = None
     student_id: Optional[UUID] = None
 
 class JournalEntryResponse(BaseModel):
     id: UUID
-    date: str
+    date: dt.date
     content: str
     student_id: UUID
 
     class Config:
         orm_mode = True
+
+class StudentLesson(ScheduleResponse):
+    tutor: Optional[TutorResponse]
+    place: Optional[PlaceResponse]
+
+class TutorLesson(ScheduleResponse):
+    student: Optional[StudentResponse]
+    place: Optional[PlaceResponse]
+
+class StudentOverview(BaseModel):
+    student: StudentResponse
+    upcoming_lessons: List[StudentLesson]
+    unread_notifications: List[NotificationResponse]
+    recent_journal_entries: List[JournalEntryResponse]
+
+class TutorOverview(BaseModel):
+    tutor: TutorResponse
+    upcoming_lessons: List[TutorLesson]
+
+class JournalSearchResult(JournalEntryResponse):
+    rank: float
+    headline: str
+
+class PersonSearchResult(BaseModel):
+    id: UUID
+    role: str
+    lastname: str
+    name: str
+    score: float
+
+class PlaceSearchResult(PlaceResponse):
+    score: float
+
+class FreeSlot(BaseModel):
+    start: dt.datetime
+    end: dt.datetime
+
+class BulkError(BaseModel):
+    index: int
+    detail: Any
+
+class BulkResult(BaseModel):
+    inserted: int
+    ids: List[UUID]
+    errors: List[BulkError]
+
+class BulkDeleteResult(BaseModel):
+    deleted: int
+
+class MonthStats(BaseModel):
+    month: dt.date
+    lessons: int
+    lesson_minutes: int
+
+class StudentMonthStats(MonthStats):
+    journal_entries: int
+
+# utilisation - доля рабочих часов месяца (AVAILABILITY_DAY_START..AVAILABILITY_DAY_END), занятая занятиями
+class UtilisationMonthStats(MonthStats):
+    utilisation: float
+
+class StudentLessonCount(BaseModel):
+    student_id: UUID
+    lessons: int
+    lesson_minutes: int
+
+class StudentStats(BaseModel):
+    student_id: UUID
+    lessons: int
+    lesson_minutes: int
+    journal_entries: int
+    longest_streak: int
+    current_streak: int
+    last_active_week: Optional[dt.date]
+    months: List[StudentMonthStats]
+
+class TutorStats(BaseModel):
+    tutor_id: UUID
+    lessons: int
+    lesson_minutes: int
+    months: List[UtilisationMonthStats]
+    students: List[StudentLessonCount]
+
+class PlaceStats(BaseModel):
+    place_id: UUID
+    lessons: int
+    lesson_minutes: int
+    months: List[UtilisationMonthStats]
@@ -0,0 +1,320 @@
+import asyncio
+import logging
+import smtplib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from sqlalchemy import and_, bindparam, exists, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import aliased, sessionmaker
+from cache import entity_cache
+from config import settings
+from database import engine_options
+from metrics import Counter, instrument_engine
+from models.models import Notification, Schedule, Student
+
+log = logging.getLogger("tutorhelper.notify")
+
+GENERATED = Counter("notifications_generated_total", "Созданные напоминания о занятиях")
+DELIVERED = Counter("notifications_delivered_total", "Результаты доставки уведомлений", ("channel", "result"))
+
+# Ключ pg_try_advisory_xact_lock: генерацию выполняет один воркер за такт
+REMINDER_LOCK = 0x7475746F72
+
+
+@dataclass
+class Delivery:
+    id: object
+    message: str
+    email: str | None
+    attempts: int
+
+
+class DeliveryError(Exception):
+    # permanent - повторять бессмысленно (например, нет адреса)
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+# Канал доставки; новые каналы регистрируются через register_channel
+class Channel:
+    name = ""
+
+    async def send(self, delivery: Delivery):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LogChannel(Channel):
+    name = "log"
+
+    async def send(self, delivery: Delivery):
+        log.info("Уведомление %s для %s: %s", delivery.id, delivery.email, delivery.message)
+
+
+class SmtpChannel(Channel):
+    name = "smtp"
+
+    def _send(self, message: EmailMessage):
+        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.NOTIFY_SEND_TIMEOUT) as smtp:
+            if settings.SMTP_STARTTLS:
+                smtp.starttls()
+            if settings.SMTP_USER:
+                smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+            smtp.send_message(message)
+
+    async def send(self, delivery: Delivery):
+        if not delivery.email:
+            raise DeliveryError("У получателя не указан email", permanent=True)
+        message = EmailMessage()
+        message["From"] = settings.SMTP_FROM
+        message["To"] = delivery.email
+        message["Subject"] = settings.app_name
+        message.set_content(delivery.message)
+        try:
+            # smtplib блокирующий - отправляем в пуле потоков, не задерживая цикл событий
+            await asyncio.to_thread(self._send, message)
+        except smtplib.SMTPRecipientsRefused as e:
+            # 4xx - временный отказ (ящик занят, greylisting), письмо отправится повторно
+            permanent = all(code >= 500 for code, _ in e.recipients.values())
+            raise DeliveryError(f"Адрес отклонен: {e.recipients}", permanent=permanent)
+
+
+channels = {"log": LogChannel, "smtp": SmtpChannel}
+
+
+def register_channel(name: str, factory):
+    channels[name] = factory
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.NOTIFY_RETRY_DELAY * 2 ** max(attempts - 1, 0))
+
+
+# Напоминания о занятиях в ближайшие NOTIFY_REMINDER_HOURS часов одной командой
+# INSERT ... SELECT в БД: тысячи строк не проходят через Python. Повторы исключает
+# проверка already_sent под блокировкой REMINDER_LOCK: напоминание о еще не начавшемся
+# занятии создано не раньше NOTIFY_REMINDER_HOURS назад, поэтому проверка затрагивает
+# только последние секции уведомлений
+def reminders_statement():
+    starts_at = Schedule.date + Schedule.time
+    reminder = aliased(Notification)
+    already_sent = exists().where(
+        reminder.schedule_id == Schedule.id, reminder.kind == "reminder",
+        reminder.created_at >= func.now() - timedelta(hours=settings.NOTIFY_REMINDER_HOURS),
+    )
+    source = select(
+        func.gen_random_uuid(),
+        func.format("Напоминание: занятие %s в %s", func.to_char(Schedule.date, "DD.MM.YYYY"),
+                    func.to_char(Schedule.time, "HH24:MI")),
+        Schedule.student_id,
+        Schedule.id,
+        literal("reminder"),
+    ).where(
+        Schedule.student_id.is_not(None),
+        Schedule.date.between(func.current_date(), func.current_date() + settings.NOTIFY_REMINDER_HOURS // 24 + 1),
+        starts_at > func.localtimestamp(),
+        starts_at <= func.localtimestamp() + timedelta(hours=settings.NOTIFY_REMINDER_HOURS),
+        ~already_sent,
+    )
+    return insert(Notification).from_select(["id", "message", "student_id", "schedule_id", "kind"], source)
+
+
+# Захват пачки к отправке: FOR UPDATE SKIP LOCKED позволяет нескольким процессам
+# разбирать очередь параллельно, а next_attempt_at служит арендой - если процесс
+# упал посреди отправки, строка вернется в очередь по истечении NOTIFY_LEASE
+def claim_statement(limit: int):
+    due = (
+        select(Notification.id)
+        .where(Notification.status.in_(("pending", "sending")), Notification.next_attempt_at <= func.now())
+        .order_by(Notification.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    email = select(Student.email).where(Student.id == Notification.student_id).scalar_subquery()
+    return (
+        update(Notification)
+        .where(Notification.id.in_(due))
+        .values(status="sending", attempts=Notification.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=settings.NOTIFY_LEASE))
+        .returning(Notification.id, Notification.message, email, Notification.attempts)
+        .execution_options(synchronize_session=False)
+    )
+
+
+table = Notification.__table__
+RESULT_STATEMENT = (
+    update(table)
+    .where(and_(table.c.id == bindparam("_id"), table.c.status == "sending"))
+    .values(status=bindparam("_status"), attempts=bindparam("_attempts"), sent_at=bindparam("_sent_at"),
+            next_attempt_at=bindparam("_next_attempt_at"), last_error=bindparam("_last_error"))
+)
+
+
+# Планировщик и доставка уведомлений в фоне. Работает через собственный небольшой
+# пул соединений, чтобы не конкурировать с API за соединения основного пула
+class Notifier:
+    def __init__(self):
+        self.queue: asyncio.Queue | None = None
+        self.results = []
+        self.tasks = []
+        self.workers = []
+        self.wakeup = asyncio.Event()
+        self.flushed = asyncio.Event()
+        self.engine = None
+        self.session = None
+        self.channel: Channel | None = None
+
+    async def start(self):
+        options = engine_options()
+        options.update(pool_size=2, max_overflow=1)
+        self.engine = create_async_engine(settings.DATABASE_URL, **options)
+        instrument_engine(self.engine, "notifier")
+        self.session = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.channel = channels[settings.NOTIFY_CHANNEL]()
+        self.queue = asyncio.Queue(maxsize=settings.NOTIFY_QUEUE_SIZE)
+        self.tasks = [
+            asyncio.create_task(self._loop(self.generate, settings.NOTIFY_SCHEDULE_INTERVAL), name="notify-scheduler"),
+            asyncio.create_task(self._dispatch(), name="notify-dispatcher"),
+            asyncio.create_task(self._flusher(), name="notify-flusher"),
+        ]
+        self.workers = [asyncio.create_task(self._worker(), name=f"notify-worker-{i}")
+                        for i in range(settings.NOTIFY_WORKERS)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        # Доставки, которые не успели начаться, возвращаем в очередь без траты попытки
+        while not self.queue.empty():
+            delivery = self.queue.get_nowait()
+            self.queue.task_done()
+            self.results.append(self._result(delivery, "pending", delivery.attempts - 1, datetime.now(timezone.utc)))
+        try:
+            await asyncio.wait_for(self.queue.join(), settings.NOTIFY_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning("Не все уведомления доставлены до остановки")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        await self.flush()
+        await self.channel.close()
+        await self.engine.dispose()
+
+    async def _loop(self, step, interval: float):
+        while True:
+            try:
+                await step()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Ошибка фоновой задачи уведомлений")
+            await asyncio.sleep(interval)
+
+    async def generate(self) -> int:
+        async with self.session() as session:
+            locked = await session.scalar(select(func.pg_try_advisory_xact_lock(REMINDER_LOCK)))
+            if not locked:
+                return 0
+            result = await session.execute(reminders_statement())
+            await session.commit()
+        if result.rowcount:
+            GENERATED.inc(amount=result.rowcount)
+            self.wakeup.set()
+        return result.rowcount
+
+    async def claim(self) -> int:
+        free = self.queue.maxsize - self.queue.qsize()
+        if free <= 0:
+            return 0
+        async with self.session() as session:
+            rows = (await session.execute(claim_statement(min(settings.NOTIFY_BATCH_SIZE, free)))).all()
+            await session.commit()
+        for row in rows:
+            self.queue.put_nowait(Delivery(*row))
+        return len(rows)
+
+    async def _dispatch(self):
+        while True:
+            try:
+                claimed = await self.claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Ошибка выборки уведомлений к отправке")
+                claimed = 0
+            if claimed == settings.NOTIFY_BATCH_SIZE:
+                continue
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), settings.NOTIFY_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            delivery = await self.queue.get()
+            try:
+                await self.deliver(delivery)
+            finally:
+                self.queue.task_done()
+
+    async def deliver(self, delivery: Delivery):
+        now = datetime.now(timezone.utc)
+        try:
+            await asyncio.wait_for(self.channel.send(delivery), settings.NOTIFY_SEND_TIMEOUT)
+        except Exception as e:
+            permanent = isinstance(e, DeliveryError) and e.permanent
+            if permanent or delivery.attempts >= settings.NOTIFY_MAX_ATTEMPTS:
+                status = "failed"
+            else:
+                status, now = "pending", now + retry_delay(delivery.attempts)
+            DELIVERED.inc(self.channel.name, status)
+            log.warning("Уведомление %s не доставлено (попытка %d): %r", delivery.id, delivery.attempts, e)
+            self.results.append(self._result(delivery, status, delivery.attempts, now, error=repr(e)[:500]))
+        else:
+            DELIVERED.inc(self.channel.name, "sent")
+            self.results.append(self._result(delivery, "sent", delivery.attempts, now, sent_at=now))
+        if len(self.results) >= settings.NOTIFY_BATCH_SIZE:
+            self.flushed.set()
+
+    @staticmethod
+    def _result(delivery: Delivery, status: str, attempts: int, next_attempt_at, sent_at=None, error=None) -> dict:
+        return {"_id": delivery.id, "_status": status, "_attempts": attempts, "_sent_at": sent_at,
+                "_next_attempt_at": next_attempt_at, "_last_error": error}
+
+    # Результаты доставки записываются пачками одним executemany; кэш ответов
+    # /notifications/{id} с прежним статусом сбрасывается после фиксации
+    async def flush(self):
+        results, self.results = self.results, []
+        if not results:
+            return
+        try:
+            async with self.session() as session:
+                await session.execute(RESULT_STATEMENT, results)
+                await session.commit()
+        except BaseException:
+            self.results = results + self.results
+            raise
+        await entity_cache.invalidate_many("notification", [result["_id"] for result in results])
+
+    async def _flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.flushed.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+            self.flushed.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Ошибка записи результатов доставки")
+
+
+notifier = Notifier()
@@ -0,0 +1,162 @@
+import asyncio
+import datetime as dt
+import logging
+import re
+from dataclasses import dataclass
+from sqlalchemy import func, select, text
+from config import settings
+from database import async_session
+from models.models import JournalEntry, Notification
+
+log = logging.getLogger("tutorhelper.partitions")
+
+# Ключ pg_try_advisory_xact_lock: обслуживание выполняет один воркер за такт
+MAINTENANCE_LOCK = 0x706172746E
+# DDL ждет блокировку не дольше этого, чтобы не выстроить за собой очередь запросов API
+LOCK_TIMEOUT = "5s"
+
+
+# Таблица с помесячными секциями <name>_pYYYY_MM и секцией по умолчанию <name>_default
+# (см. миграцию 0011). retention - через сколько месяцев секция отсоединяется в архив
+@dataclass
+class PartitionedTable:
+    model: object
+    key: str
+    retention: object = None
+
+    @property
+    def name(self) -> str:
+        return self.model.__tablename__
+
+    def bound(self, month: dt.date) -> str:
+        # Границы секций уведомлений - по UTC, как в миграции
+        if self.key == "created_at":
+            return f"'{month.isoformat()} 00:00:00+00'"
+        return f"'{month.isoformat()}'"
+
+    def partition(self, month: dt.date) -> str:
+        return f"{self.name}_p{month:%Y_%m}"
+
+    @property
+    def month(self) -> str:
+        if self.key == "created_at":
+            return f"date_trunc('month', {self.key} AT TIME ZONE 'UTC')::date"
+        return f"date_trunc('month', {self.key})::date"
+
+
+TABLES = [
+    PartitionedTable(Notification, "created_at", lambda: settings.NOTIFICATION_RETENTION_MONTHS),
+    # Журнал хранится целиком
+    PartitionedTable(JournalEntry, "date"),
+]
+
+
+def add_months(month: dt.date, months: int) -> dt.date:
+    index = month.year * 12 + month.month - 1 + months
+    return dt.date(index // 12, index % 12 + 1, 1)
+
+
+async def partition_months(session, table: PartitionedTable) -> dict:
+    result = await session.execute(
+        text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+             "WHERE i.inhparent = to_regclass(:parent)"),
+        {"parent": table.name},
+    )
+    pattern = re.compile(rf"{table.name}_p(\d{{4}})_(\d{{2}})")
+    months = {}
+    for name in result.scalars():
+        match = pattern.fullmatch(name)
+        if match:
+            months[dt.date(int(match[1]), int(match[2]), 1)] = name
+    return months
+
+
+# Месяцы строк, попавших в секцию по умолчанию: раньше первой помесячной секции
+# или дальше PARTITIONS_AHEAD. Секция по умолчанию должна оставаться маленькой
+async def default_months(session, table: PartitionedTable) -> set:
+    result = await session.execute(text(f"SELECT DISTINCT {table.month} FROM {table.name}_default"))
+    return set(result.scalars())
+
+
+# Новая секция создается отдельной таблицей и присоединяется к родительской: строки
+# ее месяца, успевшие попасть в секцию по умолчанию, переносятся в нее напрямую, без
+# вставки в родительскую таблицу (и без повторного срабатывания триггера NOTIFY)
+async def create_partition(session, table: PartitionedTable, month: dt.date) -> str:
+    name, default = table.partition(month), f"{table.name}_default"
+    lower, upper = table.bound(month), table.bound(add_months(month, 1))
+    in_month = f"{table.key} >= {lower} AND {table.key} < {upper}"
+    columns = ", ".join(column.name for column in table.model.__table__.columns)
+    await session.execute(text(
+        f"CREATE TABLE {name} (LIKE {table.name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"))
+    await session.execute(text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {default} WHERE {in_month}"))
+    await session.execute(text(f"DELETE FROM {default} WHERE {in_month}"))
+    await session.execute(text(
+        f"ALTER TABLE {table.name} ATTACH PARTITION {name} FOR VALUES FROM ({lower}) TO ({upper})"))
+    return name
+
+
+# Старая секция отсоединяется и переносится в схему архива: данные остаются доступны,
+# но запросы и обслуживание основной таблицы их больше не затрагивают
+async def archive_partition(session, table: PartitionedTable, name: str) -> str:
+    await session.execute(text(f"ALTER TABLE {table.name} DETACH PARTITION {name}"))
+    await session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {settings.ARCHIVE_SCHEMA}"))
+    await session.execute(text(f"ALTER TABLE {name} SET SCHEMA {settings.ARCHIVE_SCHEMA}"))
+    return f"{settings.ARCHIVE_SCHEMA}.{name}"
+
+
+class PartitionMaintainer:
+    def __init__(self):
+        self.task = None
+
+    async def start(self):
+        self.task = asyncio.create_task(self._loop(), name="partitions")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Ошибка обслуживания секций")
+            await asyncio.sleep(settings.PARTITIONS_INTERVAL)
+
+    async def run_once(self) -> dict:
+        created, archived = [], []
+        async with async_session() as session:
+            locked = await session.scalar(select(func.pg_try_advisory_xact_lock(MAINTENANCE_LOCK)))
+            if not locked:
+                return {"created": created, "archived": archived}
+            await session.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            current = dt.datetime.now(dt.timezone.utc).date().replace(day=1)
+            for table in TABLES:
+                months = await partition_months(session, table)
+                # Строки из секции по умолчанию переезжают в секции своих месяцев и дальше
+                # подчиняются общему сроку хранения
+                needed = {add_months(current, offset) for offset in range(settings.PARTITIONS_AHEAD + 1)}
+                for month in sorted((needed | await default_months(session, table)) - months.keys()):
+                    months[month] = await create_partition(session, table, month)
+                    created.append(months[month])
+                retention = table.retention() if table.retention is not None else 0
+                if retention:
+                    cutoff = add_months(current, -retention)
+                    for month, name in sorted(months.items()):
+                        if month < cutoff:
+                            archived.append(await archive_partition(session, table, name))
+            await session.commit()
+        if created or archived:
+            log.info("Секции созданы: %s; отправлены в архив: %s", created, archived)
+        return {"created": created, "archived": archived}
+
+
+maintainer = PartitionMaintainer()
+
+
+# Разовый запуск, например из cron: python partitions.py
+if __name__ == "__main__":
+    print(asyncio.run(maintainer.run_once()))
@@ -0,0 +1,31 @@
+import datetime as dt
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from availability import availability, free_slots
+from config import settings
+from database import get_read_db
+from models.schemas import *
+from security import get_current_user
+
+router = APIRouter()
+
+
+@router.get("/availability/tutors/{tutor_id}", response_model=List[FreeSlot], dependencies=[Depends(get_current_user)],
+            tags=["Расписание занятий"], summary="Свободные окна репетитора на неделе")
+async def tutor_availability(tutor_id: uuid.UUID,
+                             week: Optional[dt.date] = Query(None, description="Любая дата недели, по умолчанию текущая"),
+                             duration: int = Query(60, ge=1, le=24 * 60, description="Длительность окна, минут"),
+                             student_id: Optional[uuid.UUID] = Query(None, description="Учесть занятость ученика"),
+                             place_id: Optional[uuid.UUID] = Query(None, description="Учесть занятость места"),
+                             db: Session = Depends(get_read_db)):
+    week = week or dt.date.today()
+    monday = week - dt.timedelta(days=week.weekday())
+    owners = [("tutor_id", tutor_id), ("student_id", student_id), ("place_id", place_id)]
+    sunday = monday + dt.timedelta(days=6)
+    indexes = [await availability.index(db, column, owner_id, monday, sunday)
+               for column, owner_id in owners if owner_id is not None]
+    slots = free_slots(indexes, monday, 7, dt.timedelta(minutes=duration),
+                       settings.AVAILABILITY_DAY_START, settings.AVAILABILITY_DAY_END)
+    return [{"start": start, "end": end} for start, end in slots]
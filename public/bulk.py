@@ -0,0 +1,234 @@
+import asyncio
+import datetime as dt
+import uuid
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import select, insert, delete, union_all
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from availability import availability, reserve_many
+from cache import entity_cache
+from config import settings
+from database import get_write_db
+from models.models import *
+from models.schemas import *
+from security import get_current_user, hash_password
+
+router = APIRouter()
+IN_CHUNK = 5_000
+
+
+def bulk_body(schema):
+    # Описание тела запроса для OpenAPI: массив JSON или NDJSON
+    array = {"type": "array", "items": {"$ref": f"#/components/schemas/{schema.__name__}"}}
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": array},
+        "application/x-ndjson": {"schema": {"$ref": f"#/components/schemas/{schema.__name__}"}},
+    }}}
+
+
+async def read_rows(request: Request, errors: list) -> list:
+    body = await request.body()
+    if "ndjson" in request.headers.get("content-type", ""):
+        rows = []
+        for index, line in enumerate(body.splitlines()):
+            try:
+                rows.append(orjson.loads(line) if line.strip() else None)
+            except orjson.JSONDecodeError as e:
+                rows.append(None)
+                errors.append({"index": index, "detail": f"Некорректный JSON: {e}"})
+    else:
+        try:
+            rows = orjson.loads(body)
+        except orjson.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Некорректный JSON: {e}")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Ожидается массив записей")
+    if len(rows) > settings.BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Не более {settings.BULK_MAX_ROWS} записей за запрос")
+    return rows
+
+
+def validate_rows(schema, rows: list, errors: list) -> dict:
+    valid = {}
+    for index, row in enumerate(rows):
+        if row is None:
+            continue
+        try:
+            valid[index] = schema.model_validate(row).dict()
+        except ValidationError as e:
+            errors.append({"index": index, "detail": orjson.loads(e.json(include_url=False))})
+    return valid
+
+
+# Запрос IN разбивается на части, чтобы не упереться в лимит параметров драйвера
+async def select_existing(db: Session, column, values: set, extra=None) -> set:
+    values = list(values)
+    existing = set()
+    for start in range(0, len(values), IN_CHUNK):
+        part = values[start:start + IN_CHUNK]
+        query = select(column).where(column.in_(part))
+        if extra is not None:
+            query = union_all(query, select(extra).where(extra.in_(part)))
+        result = await db.execute(query)
+        existing.update(result.scalars().all())
+    return existing
+
+
+# Проверка внешних ключей: один запрос на каждую связанную таблицу
+async def check_references(db: Session, model, valid: dict, errors: list):
+    for fk in model.__table__.foreign_keys:
+        column = fk.parent.name
+        values = {row[column] for row in valid.values() if row.get(column) is not None}
+        if not values:
+            continue
+        existing = await select_existing(db, fk.column, values)
+        for index in [i for i, row in valid.items() if row.get(column) is not None and row[column] not in existing]:
+            errors.append({"index": index, "detail": f"{column}: запись не найдена"})
+            del valid[index]
+
+
+async def copy_rows(db: Session, model, rows: list):
+    columns = list(rows[0].keys())
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        model.__tablename__,
+        records=[tuple(row[c] for c in columns) for row in rows],
+        columns=columns,
+    )
+
+
+async def insert_rows(db: Session, model, rows: list) -> list:
+    if not rows:
+        return []
+    for row in rows:
+        row.setdefault("id", uuid.uuid4())
+    if len(rows) >= settings.BULK_COPY_THRESHOLD and db.bind.dialect.name == "postgresql":
+        await copy_rows(db, model, rows)
+        return [row["id"] for row in rows]
+    # Многострочный INSERT ... VALUES ... RETURNING пачками (insertmanyvalues)
+    result = await db.execute(insert(model).returning(model.id), rows)
+    return list(result.scalars().all())
+
+
+async def bulk_create(request: Request, db: Session, model, schema, atomic: bool, prepare=None,
+                      after_insert=None) -> dict:
+    errors = []
+    rows = await read_rows(request, errors)
+    valid = validate_rows(schema, rows, errors)
+    await check_references(db, model, valid, errors)
+    if prepare is not None:
+        await prepare(db, valid, errors)
+    if errors and atomic:
+        raise HTTPException(status_code=422, detail=sorted(errors, key=lambda e: e["index"]))
+    try:
+        ids = await insert_rows(db, model, list(valid.values()))
+        await db.commit()
+    except DBAPIError as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"Ошибка записи в БД: {e.orig}")
+    if after_insert is not None:
+        after_insert(valid.values())
+    return {"inserted": len(ids), "ids": ids, "errors": sorted(errors, key=lambda e: e["index"])}
+
+
+async def prepare_students(db: Session, valid: dict, errors: list):
+    seen = set()
+    for index, row in list(valid.items()):
+        if row["username"] in seen:
+            errors.append({"index": index, "detail": "Этот username занят"})
+            del valid[index]
+        seen.add(row["username"])
+    if seen:
+        taken = await select_existing(db, Student.username, seen, Tutor.username)
+        for index in [i for i, row in valid.items() if row["username"] in taken]:
+            errors.append({"index": index, "detail": "Этот username занят"})
+            del valid[index]
+    hashes = await asyncio.gather(*(hash_password(row["password"]) for row in valid.values()))
+    for row, hashed in zip(valid.values(), hashes):
+        row["password"] = hashed
+
+
+# Удаление по условию одним DELETE на пачку: строки не загружаются в Python, зависимые
+# записи удаляет БД (ON DELETE CASCADE). Пачки по BULK_DELETE_BATCH строк в отдельных
+# транзакциях не держат блокировки долго; прерванное удаление можно просто повторить
+async def delete_where(db: Session, model, *conditions) -> int:
+    batch = select(model.id).where(*conditions).limit(settings.BULK_DELETE_BATCH).scalar_subquery()
+    statement = delete(model).where(model.id.in_(batch)).execution_options(synchronize_session=False)
+    deleted = 0
+    while True:
+        try:
+            result = await db.execute(statement)
+            await db.commit()
+        except DBAPIError as e:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail=f"Ошибка удаления: {e.orig}")
+        deleted += result.rowcount
+        if result.rowcount < settings.BULK_DELETE_BATCH:
+            return deleted
+
+
+def schedules_inserted(rows):
+    for row in rows:
+        availability.added(row)
+
+
+@router.post("/students/bulk/", response_model=BulkResult, dependencies=[Depends(get_current_user)],
+             tags=["Ученики"], summary="Массовая регистрация учеников",
+             openapi_extra=bulk_body(StudentCreate))
+async def bulk_create_students(request: Request, atomic: bool = False, db: Session = Depends(get_write_db)):
+    return await bulk_create(request, db, Student, StudentCreate, atomic, prepare_students)
+
+@router.post("/schedules/bulk/", response_model=BulkResult, dependencies=[Depends(get_current_user)],
+             tags=["Расписание занятий"], summary="Массовое добавление занятий в расписание",
+             openapi_extra=bulk_body(ScheduleCreate))
+async def bulk_create_schedules(request: Request, atomic: bool = False, db: Session = Depends(get_write_db)):
+    return await bulk_create(request, db, Schedule, ScheduleCreate, atomic, reserve_many, schedules_inserted)
+
+@router.post("/notifications/bulk/", response_model=BulkResult, dependencies=[Depends(get_current_user)],
+             tags=["Уведомления о занятиях"], summary="Массовое добавление уведомлений",
+             openapi_extra=bulk_body(NotificationCreate))
+async def bulk_create_notifications(request: Request, atomic: bool = False, db: Session = Depends(get_write_db)):
+    return await bulk_create(request, db, Notification, NotificationCreate, atomic)
+
+@router.post("/journal_entries/bulk/", response_model=BulkResult, dependencies=[Depends(get_current_user)],
+             tags=["Отслеживание прогресса обучения - журнал"], summary="Массовое добавление записей в журнал",
+             openapi_extra=bulk_body(JournalEntryCreate))
+async def bulk_create_journal_entries(request: Request, atomic: bool = False, db: Session = Depends(get_write_db)):
+    return await bulk_create(request, db, JournalEntry, JournalEntryCreate, atomic)
+
+@router.delete("/schedules/bulk/", response_model=BulkDeleteResult, dependencies=[Depends(get_current_user)],
+               tags=["Расписание занятий"], summary="Массовое удаление занятий по условию")
+async def bulk_delete_schedules(student_id: uuid.UUID | None = None, tutor_id: uuid.UUID | None = None,
+                                place_id: uuid.UUID | None = None, date_from: dt.date | None = None,
+                                date_to: dt.date | None = None, db: Session = Depends(get_write_db)):
+    owners = {Schedule.student_id: student_id, Schedule.tutor_id: tutor_id, Schedule.place_id: place_id}
+    conditions = [column == value for column, value in owners.items() if value is not None]
+    if not conditions:
+        raise HTTPException(status_code=400, detail="Укажите student_id, tutor_id или place_id")
+    if date_from is not None:
+        conditions.append(Schedule.date >= date_from)
+    if date_to is not None:
+        conditions.append(Schedule.date <= date_to)
+    deleted = await delete_where(db, Schedule, *conditions)
+    if deleted:
+        await entity_cache.invalidate_all("schedule")
+        await entity_cache.invalidate_all("notification")
+        availability.clear()
+    return {"deleted": deleted}
+
+@router.delete("/notifications/bulk/", response_model=BulkDeleteResult, dependencies=[Depends(get_current_user)],
+               tags=["Уведомления о занятиях"], summary="Массовое удаление уведомлений старше заданной даты")
+async def bulk_delete_notifications(older_than: dt.datetime, student_id: uuid.UUID | None = None,
+                                    status: str | None = None, db: Session = Depends(get_write_db)):
+    conditions = [Notification.created_at < older_than]
+    if student_id is not None:
+        conditions.append(Notification.student_id == student_id)
+    if status is not None:
+        conditions.append(Notification.status == status)
+    deleted = await delete_where(db, Notification, *conditions)
+    if deleted:
+        await entity_cache.invalidate_all("notification")
+    return {"deleted": deleted}
@@ -0,0 +1,37 @@
+import datetime as dt
+import uuid
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from config import settings
+from database import get_read_db
+from models.models import *
+from models.schemas import *
+from security import get_current_user
+
+router = APIRouter()
+
+
+# Запрос использует составные индексы (tutor_id|student_id, date, time)
+async def lessons_between(db: Session, column, owner_id: uuid.UUID, date_from: dt.date, date_to: dt.date):
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to раньше date_from")
+    if (date_to - date_from).days > settings.CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Диапазон не может превышать {settings.CALENDAR_MAX_DAYS} дней")
+    result = await db.execute(
+        select(Schedule)
+        .filter(column == owner_id, Schedule.date >= date_from, Schedule.date <= date_to)
+        .order_by(Schedule.date, Schedule.time)
+    )
+    return result.scalars().all()
+
+@router.get("/calendar/tutors/{tutor_id}", response_model=List[ScheduleResponse], dependencies=[Depends(get_current_user)],
+            tags=["Расписание занятий"], summary="Занятия репетитора за период")
+async def tutor_calendar(tutor_id: uuid.UUID, date_from: dt.date, date_to: dt.date, db: Session = Depends(get_read_db)):
+    return await lessons_between(db, Schedule.tutor_id, tutor_id, date_from, date_to)
+
+@router.get("/calendar/students/{student_id}", response_model=List[ScheduleResponse], dependencies=[Depends(get_current_user)],
+            tags=["Расписание занятий"], summary="Занятия ученика за период")
+async def student_calendar(student_id: uuid.UUID, date_from: dt.date, date_to: dt.date, db: Session = Depends(get_read_db)):
+    return await lessons_between(db, Schedule.student_id, student_id, date_from, date_to)
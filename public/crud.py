@@ -1,351 +1,242 @@
+import datetime as dt
+import operator
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from database import get_db
-from typing import List
+from sqlalchemy import event, select, literal, union_all
+from database import get_write_db
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from models.models import *
 from models.schemas import *
-from passlib.context import CryptContext
+from public.factory import crud_router
+from availability import OWNERS, availability, reserve
+from config import settings
+from security import (hash_password, verify_password, create_token, decode_token, revoke_token,
+                      get_current_user, TokenError)
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 security = HTTPBasic()
 
 
-@router.post("/login/", tags=["Аутентификация пользователей"],
+def issue_tokens(user_id, username: str, role: str) -> dict:
+    return {
+        "username": username,
+        "access_token": create_token(user_id, username, role, "access"),
+        "refresh_token": create_token(user_id, username, role, "refresh"),
+        "token_type": "bearer",
+    }
+
+@router.post("/login/", response_model=TokenResponse, tags=["Аутентификация пользователей"],
              summary="Вход пользователя с ролью репетитора или ученика")
-async def login(credentials: HTTPBasicCredentials = Depends(security), db: Session = Depends(get_db)):
+async def login(credentials: HTTPBasicCredentials = Depends(security), db: Session = Depends(get_write_db)):
     user = await authenticate_user(credentials.username, credentials.password, db)
     if not user:
         raise HTTPException(status_code=401, detail="Неверный username/password")
-    return {"username": user.username}
+    return issue_tokens(user.id, user.username, user.role)
+
+@router.post("/token/refresh/", response_model=TokenResponse, tags=["Аутентификация пользователей"],
+             summary="Обновление пары токенов по refresh-токену")
+async def refresh_tokens(body: RefreshRequest, db: Session = Depends(get_write_db)):
+    try:
+        claims = decode_token(body.refresh_token, "refresh")
+    except TokenError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    # refresh-токен одноразовый: из параллельных запросов с ним проходит только один
+    if not await revoke_token(db, claims):
+        raise HTTPException(status_code=401, detail="Токен отозван")
+    return issue_tokens(claims["sub"], claims["username"], claims["role"])
+
+@router.post("/logout/", tags=["Аутентификация пользователей"],
+             summary="Выход пользователя (отзыв токенов)")
+async def logout(body: RefreshRequest | None = None, claims: dict = Depends(get_current_user),
+                 db: Session = Depends(get_write_db)):
+    await revoke_token(db, claims)
+    if body is not None:
+        try:
+            await revoke_token(db, decode_token(body.refresh_token, "refresh"))
+        except TokenError:
+            pass
+    return {"message": "Выход выполнен"}
+
+# Ученики и репетиторы ищутся одним запросом
+def users_by_username(username: str, exclude_id: uuid.UUID | None = None):
+    students = select(Student.id, Student.username, Student.password, literal("student").label("role")) \
+        .filter(Student.username == username)
+    tutors = select(Tutor.id, Tutor.username, Tutor.password, literal("tutor").label("role")) \
+        .filter(Tutor.username == username)
+    if exclude_id is not None:
+        students = students.filter(Student.id != exclude_id)
+        tutors = tutors.filter(Tutor.id != exclude_id)
+    return union_all(students, tutors)
+
+async def username_taken(username: str, db: Session, exclude_id: uuid.UUID | None = None) -> bool:
+    result = await db.execute(select(users_by_username(username, exclude_id).subquery().c.id).limit(1))
+    return result.first() is not None
 
 async def authenticate_user(username: str, password: str, db: Session):
-    async with db as session:
-        result = await session.execute(select(Student).filter(Student.username == username))
-        student = result.scalars().first()
-        if student and pwd_context.verify(password, student.password):
-            return student
-
-        result = await session.execute(select(Tutor).filter(Tutor.username == username))
-        tutor = result.scalars().first()
-        if tutor and pwd_context.verify(password, tutor.password):
-            return tutor
+    result = await db.execute(users_by_username(username))
+    for user in result.all():
+        if await verify_password(password, user.password):
+            return user
 
     return None
 
-# CRUD для учеников
-@router.post("/students/", response_model=StudentResponse, tags=["Ученики"],\
-             summary="Создание (регистрация) пользователя с ролью ученика")
-async def create_student(student: StudentCreate, db: Session = Depends(get_db)):
+async def prepare_user_create(data: dict, db: Session) -> dict:
     # Проверяем, существует ли уже пользователь с таким именем
-    existing_student = await db.execute(select(Student).filter(Student.username == student.username))
-    existing_tutor = await db.execute(select(Tutor).filter(Tutor.username == student.username))
-
-    if existing_student.scalar() or existing_tutor.scalar():
+    if await username_taken(data["username"], db):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Этот username занят")
+    data["password"] = await hash_password(data["password"])
+    return data
 
-    student_data = student.dict()
-    hashed_password = pwd_context.hash(student.password)
-    student_data["password"] = hashed_password
-    new_student = Student(**student_data)
-    db.add(new_student)
-    await db.commit()
-    await db.refresh(new_student)
-    return new_student
-
-@router.get("/students/", response_model=List[StudentResponse], tags=["Ученики"],\
-             summary="Получение списка всех учеников")
-async def get_students(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    students = await db.execute(select(Student).offset(skip).limit(limit))
-    return students.scalars().all()
-
-@router.get("/students/{student_id}", response_model=StudentResponse, tags=["Ученики"],\
-             summary="Поиск ученика по идентификатору")
-async def get_student(student_id: uuid.UUID, db: Session = Depends(get_db)):
-    student = await db.execute(select(Student).filter(Student.id == student_id))
-    result = student.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    return result
-
-@router.put("/students/{student_id}", response_model=StudentResponse, tags=["Ученики"],\
-             summary="Обновление записи об ученике по его идентификатору")
-async def update_student(student_id: uuid.UUID, student: StudentUpdate, db: Session = Depends(get_db)):
-    db_student = await db.execute(select(Student).filter(Student.id == student_id))
-    result = db_student.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    for var, value in student.dict().items():
-        setattr(result, var, value)
-    await db.commit()
-    await db.refresh(result)
-    return result
-
-@router.delete("/students/{student_id}", tags=["Ученики"],\
-             summary="Удаление данных об ученике по его идентификатору")
-async def delete_student(student_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_student = await db.execute(select(Student).filter(Student.id == student_id))
-    result = db_student.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    await db.delete(result)
-    await db.commit()
-    return {"message": "Запись удалена"}
-
-# CRUD для репетиторов
-@router.post("/tutors/", response_model=TutorResponse, tags=["Репетиторы"],\
-             summary="Создание (регистрация) пользователя с ролью репетитора")
-async def create_tutor(tutor: TutorCreate, db: Session = Depends(get_db)):
-    # Проверяем, существует ли уже пользователь с таким именем
-    existing_student = await db.execute(select(Student).filter(Student.username == tutor.username))
-    existing_tutor = await db.execute(select(Tutor).filter(Tutor.username == tutor.username))
-
-    if existing_student.scalar() or existing_tutor.scalar():
+async def prepare_user_update(object_id: uuid.UUID, data: dict, db: Session) -> dict:
+    if data.get("username") is not None and await username_taken(data["username"], db, object_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Этот username занят")
-    tutor_data = tutor.dict()
-    hashed_password = pwd_context.hash(tutor.password)
-    tutor_data["password"] = hashed_password
-    new_tutor = Tutor(**tutor_data)
-    db.add(new_tutor)
-    await db.commit()
-    await db.refresh(new_tutor)
-    return new_tutor
+    if data.get("password") is not None:
+        data["password"] = await hash_password(data["password"])
+    return data
+
+async def prepare_schedule_create(data: dict, db: Session) -> dict:
+    await reserve(db, data)
+    return data
+
+async def prepare_schedule_update(object_id: uuid.UUID, data: dict, db: Session) -> dict:
+    if not data.keys() & {"date", "time", "duration_minutes", *OWNERS}:
+        return data
+    result = await db.execute(
+        select(Schedule.date, Schedule.time, Schedule.duration_minutes, *(getattr(Schedule, c) for c in OWNERS))
+        .filter(Schedule.id == object_id)
+    )
+    current = result.mappings().first()
+    if current is None:
+        raise HTTPException(status_code=404, detail="Запись не найдена")
+    await reserve(db, {**current, **data}, exclude_id=object_id)
+    # Индексы прежних владельцев сбрасываются после фиксации UPDATE: сброс до записи
+    # позволил бы параллельному чтению снова загрузить старый интервал
+    event.listen(db.sync_session, "after_commit", lambda session: availability.invalidate(current), once=True)
+    return data
+
+# Удаление ученика или репетитора каскадно удаляет его занятия, которые могут
+# оставаться в индексах занятости других владельцев
+def owner_written(action: str, row):
+    if action == "delete":
+        availability.clear()
+
+def schedule_written(action: str, row):
+    if action == "create":
+        availability.added(row)
+    else:
+        availability.invalidate(row)
+
+def days_ago(days: int):
+    return lambda: dt.date.today() - dt.timedelta(days=days)
+
+def time_ago(days: int):
+    return lambda: dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days)
+
+# Фильтры списков: имя query-параметра -> (столбец, оператор[, значение по умолчанию]);
+# все покрыты индексами. Уведомления и журнал секционированы помесячно: без явной
+# нижней границы список берет только недавние секции
+SCHEDULE_FILTERS = {
+    "student_id": (Schedule.student_id, operator.eq),
+    "tutor_id": (Schedule.tutor_id, operator.eq),
+    "place_id": (Schedule.place_id, operator.eq),
+    "date_from": (Schedule.date, operator.ge),
+    "date_to": (Schedule.date, operator.le),
+}
+NOTIFICATION_FILTERS = {
+    "student_id": (Notification.student_id, operator.eq),
+    "schedule_id": (Notification.schedule_id, operator.eq),
+    "created_from": (Notification.created_at, operator.ge, time_ago(settings.NOTIFICATION_RECENT_DAYS)),
+    "created_to": (Notification.created_at, operator.le),
+}
+JOURNAL_FILTERS = {
+    "student_id": (JournalEntry.student_id, operator.eq),
+    "date_from": (JournalEntry.date, operator.ge, days_ago(settings.JOURNAL_RECENT_DAYS)),
+    "date_to": (JournalEntry.date, operator.le),
+}
 
-@router.get("/tutors/", response_model=List[TutorResponse], tags=["Репетиторы"],\
-             summary="Получения списка всех репетиторов")
-async def get_tutors(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    tutors = await db.execute(select(Tutor).offset(skip).limit(limit))
-    return tutors.scalars().all()
-
-@router.get("/tutors/{tutor_id}", response_model=TutorResponse, tags=["Репетиторы"],\
-             summary="Поиск репетитора по его идентификатору")
-async def get_tutor(tutor_id: uuid.UUID, db: Session = Depends(get_db)):
-    tutor = await db.execute(select(Tutor).filter(Tutor.id == tutor_id))
-    result = tutor.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    return result
-
-@router.put("/tutors/{tutor_id}", response_model=TutorResponse, tags=["Репетиторы"],\
-             summary="Обновление записи о репетиторе по его идентификатору")
-async def update_tutor(tutor_id: uuid.UUID, tutor: TutorUpdate, db: Session = Depends(get_db)):
-    db_tutor = await db.execute(select(Tutor).filter(Tutor.id == tutor_id))
-    result = db_tutor.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    for var, value in tutor.dict().items():
-        setattr(result, var, value)
-    await db.commit()
-    await db.refresh(result)
-    return result
+# CRUD для учеников
+router.include_router(crud_router(
+    Student, StudentCreate, StudentUpdate, StudentResponse,
+    name="student", plural="students", tag="Ученики", cache_ttl=settings.CACHE_TTL,
+    prepare_create=prepare_user_create, prepare_update=prepare_user_update, after_write=owner_written,
+    public_create=True, cascades=("schedule", "notification", "journal_entry"),
+    summaries={
+        "create": "Создание (регистрация) пользователя с ролью ученика",
+        "list": "Получение списка всех учеников",
+        "get": "Поиск ученика по идентификатору",
+        "update": "Обновление записи об ученике по его идентификатору",
+        "delete": "Удаление данных об ученике по его идентификатору",
+    },
+))
 
-@router.delete("/tutors/{tutor_id}", tags=["Репетиторы"],\
-             summary="Удаление репетитора по его идентификатору")
-async def delete_tutor(tutor_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_tutor = await db.execute(select(Tutor).filter(Tutor.id == tutor_id))
-    result = db_tutor.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    await db.delete(result)
-    await db.commit()
-    return {"message": "Запись удалена"}
+# CRUD для репетиторов
+router.include_router(crud_router(
+    Tutor, TutorCreate, TutorUpdate, TutorResponse,
+    name="tutor", plural="tutors", tag="Репетиторы", cache_ttl=settings.CACHE_STATIC_TTL,
+    prepare_create=prepare_user_create, prepare_update=prepare_user_update, after_write=owner_written,
+    public_create=True, cascades=("schedule", "notification"),
+    summaries={
+        "create": "Создание (регистрация) пользователя с ролью репетитора",
+        "list": "Получения списка всех репетиторов",
+        "get": "Поиск репетитора по его идентификатору",
+        "update": "Обновление записи о репетиторе по его идентификатору",
+        "delete": "Удаление репетитора по его идентификатору",
+    },
+))
 
 # CRUD для мест
-@router.post("/places/", response_model=PlaceResponse, tags=["Места"],\
-             summary="Добавление места занятий")
-async def create_place(place: PlaceCreate, db: Session = Depends(get_db)):
-    new_place = Place(**place.dict())
-    db.add(new_place)
-    await db.commit()
-    await db.refresh(new_place)
-    return new_place
-
-@router.get("/places/", response_model=List[PlaceResponse], tags=["Места"],\
-             summary="Список всех мест")
-async def get_places(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    places = await db.execute(select(Place).offset(skip).limit(limit))
-    return places.scalars().all()
-
-@router.get("/places/{place_id}", response_model=PlaceResponse, tags=["Места"],\
-             summary="Поиск места по его идентификатору")
-async def get_place(place_id: uuid.UUID, db: Session = Depends(get_db)):
-    place = await db.execute(select(Place).filter(Place.id == place_id))
-    result = place.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    return result
-
-@router.put("/places/{place_id}", response_model=PlaceResponse, tags=["Места"],\
-             summary="Обновление записи о месте")
-async def update_place(place_id: uuid.UUID, place: PlaceUpdate, db: Session = Depends(get_db)):
-    db_place = await db.execute(select(Place).filter(Place.id == place_id))
-    result = db_place.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    for var, value in place.dict().items():
-        setattr(result, var, value)
-    await db.commit()
-    await db.refresh(result)
-    return result
-
-@router.delete("/places/{place_id}", tags=["Места"],\
-             summary="Удаление записи о месте")
-async def delete_place(place_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_place = await db.execute(select(Place).filter(Place.id == place_id))
-    result = db_place.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    await db.delete(result)
-    await db.commit()
-    return {"message": "Запись удалена"}
+router.include_router(crud_router(
+    Place, PlaceCreate, PlaceUpdate, PlaceResponse,
+    name="place", plural="places", tag="Места", cache_ttl=settings.CACHE_STATIC_TTL, cascades=("schedule",),
+    summaries={
+        "create": "Добавление места занятий",
+        "list": "Список всех мест",
+        "get": "Поиск места по его идентификатору",
+        "update": "Обновление записи о месте",
+        "delete": "Удаление записи о месте",
+    },
+))
 
 # CRUD для расписания
-@router.post("/schedules/", response_model=ScheduleResponse, tags=["Расписание занятий"],\
-             summary="Добавление занятие в расписание")
-async def create_schedule(schedule: ScheduleCreate, db: Session = Depends(get_db)):
-    new_schedule = Schedule(**schedule.dict())
-    db.add(new_schedule)
-    await db.commit()
-    await db.refresh(new_schedule)
-    return new_schedule
-
-@router.get("/schedules/", response_model=List[ScheduleResponse], tags=["Расписание занятий"],\
-             summary="Получение списка всех записей о занятиях")
-async def get_schedules(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    schedules = await db.execute(select(Schedule).offset(skip).limit(limit))
-    return schedules.scalars().all()
-
-@router.get("/schedules/{schedule_id}", response_model=ScheduleResponse, tags=["Расписание занятий"],\
-             summary="Поиск занятия в расписании")
-async def get_schedule(schedule_id: uuid.UUID, db: Session = Depends(get_db)):
-    schedule = await db.execute(select(Schedule).filter(Schedule.id == schedule_id))
-    result = schedule.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    return result
-
-@router.put("/schedules/{schedule_id}", response_model=ScheduleResponse, tags=["Расписание занятий"],\
-             summary="Редактирование записи о занятии")
-async def update_schedule(schedule_id: uuid.UUID, schedule: ScheduleUpdate, db: Session = Depends(get_db)):
-    db_schedule = await db.execute(select(Schedule).filter(Schedule.id == schedule_id))
-    result = db_schedule.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    for var, value in schedule.dict().items():
-        setattr(result, var, value)
-    await db.commit()
-    await db.refresh(result)
-    return result
-
-@router.delete("/schedules/{schedule_id}", tags=["Расписание занятий"],\
-             summary="Удаление записи о занятии")
-async def delete_schedule(schedule_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_schedule = await db.execute(select(Schedule).filter(Schedule.id == schedule_id))
-    result = db_schedule.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    await db.delete(result)
-    await db.commit()
-    return {"message": "Запись удалена"}
+router.include_router(crud_router(
+    Schedule, ScheduleCreate, ScheduleUpdate, ScheduleResponse,
+    name="schedule", plural="schedules", tag="Расписание занятий", cache_ttl=settings.CACHE_TTL,
+    prepare_create=prepare_schedule_create, prepare_update=prepare_schedule_update, after_write=schedule_written,
+    cascades=("notification",), filters=SCHEDULE_FILTERS,
+    summaries={
+        "create": "Добавление занятие в расписание",
+        "list": "Получение списка всех записей о занятиях",
+        "get": "Поиск занятия в расписании",
+        "update": "Редактирование записи о занятии",
+        "delete": "Удаление записи о занятии",
+    },
+))
 
 # CRUD для уведомлений
-@router.post("/notifications/", response_model=NotificationResponse, tags=["Уведомления о занятиях"],\
-             summary="Добавление уведомления о занятии")
-async def create_notification(notification: NotificationCreate, db: Session = Depends(get_db)):
-    new_notification = Notification(**notification.dict())
-    db.add(new_notification)
-    await db.commit()
-    await db.refresh(new_notification)
-    return new_notification
-
-@router.get("/notifications/", response_model=List[NotificationResponse], tags=["Уведомления о занятиях"],\
-             summary="Получения списка уведомлений")
-async def get_notifications(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    notifications = await db.execute(select(Notification).offset(skip).limit(limit))
-    return notifications.scalars().all()
-
-@router.get("/notifications/{notification_id}", response_model=NotificationResponse, tags=["Уведомления о занятиях"],\
-             summary="Поиск уведомления по идентификатору")
-async def get_notification(notification_id: uuid.UUID, db: Session = Depends(get_db)):
-    notification = await db.execute(select(Notification).filter(Notification.id == notification_id))
-    result = notification.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    return result
-
-@router.put("/notifications/{notification_id}", response_model=NotificationResponse, tags=["Уведомления о занятиях"],\
-             summary="Обновление уведомления")
-async def update_notification(notification_id: uuid.UUID, notification: NotificationUpdate, db: Session = Depends(get_db)):
-    db_notification = await db.execute(select(Notification).filter(Notification.id == notification_id))
-    result = db_notification.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    for var, value in notification.dict().items():
-        setattr(result, var, value)
-    await db.commit()
-    await db.refresh(result)
-    return result
-
-@router.delete("/notifications/{notification_id}", tags=["Уведомления о занятиях"],\
-             summary="Удаление уведомления")
-async def delete_notification(notification_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_notification = await db.execute(select(Notification).filter(Notification.id == notification_id))
-    result = db_notification.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    await db.delete(result)
-    await db.commit()
-    return {"message": "Запись удалена"}
+router.include_router(crud_router(
+    Notification, NotificationCreate, NotificationUpdate, NotificationResponse,
+    name="notification", plural="notifications", tag="Уведомления о занятиях", cache_ttl=settings.CACHE_TTL,
+    filters=NOTIFICATION_FILTERS,
+    summaries={
+        "create": "Добавление уведомления о занятии",
+        "list": "Получения списка уведомлений",
+        "get": "Поиск уведомления по идентификатору",
+        "update": "Обновление уведомления",
+        "delete": "Удаление уведомления",
+    },
+))
 
 # CRUD для журнала
-@router.post("/journal_entries/", response_model=JournalEntryResponse, tags=["Отслеживание прогресса обучения - журнал"],\
-             summary="Добавление сведений о проведенном занятии")
-async def create_journal_entry(journal_entry: JournalEntryCreate, db: Session = Depends(get_db)):
-    new_journal_entry = JournalEntry(**journal_entry.dict())
-    db.add(new_journal_entry)
-    await db.commit()
-    await db.refresh(new_journal_entry)
-    return new_journal_entry
-
-@router.get("/journal_entries/", response_model=List[JournalEntryResponse], tags=["Отслеживание прогресса обучения - журнал"],\
-             summary="Получение всего журнала записей о занятиях")
-async def get_journal_entries(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    journal_entries = await db.execute(select(JournalEntry).offset(skip).limit(limit))
-    return journal_entries.scalars().all()
-
-@router.get("/journal_entries/{journal_entry_id}", response_model=JournalEntryResponse, tags=["Отслеживание прогресса обучения - журнал"],\
-             summary="Поиск записи в журнале")
-async def get_journal_entry(journal_entry_id: uuid.UUID, db: Session = Depends(get_db)):
-    journal_entry = await db.execute(select(JournalEntry).filter(JournalEntry.id == journal_entry_id))
-    result = journal_entry.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    return result
-
-@router.put("/journal_entries/{journal_entry_id}", response_model=JournalEntryResponse, tags=["Отслеживание прогресса обучения - журнал"],\
-             summary="Обновление записи в журнале")
-async def update_journal_entry(journal_entry_id: uuid.UUID, journal_entry: JournalEntryUpdate, db: Session = Depends(get_db)):
-    db_journal_entry = await db.execute(select(JournalEntry).filter(JournalEntry.id == journal_entry_id))
-    result = db_journal_entry.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    for var, value in journal_entry.dict().items():
-        setattr(result, var, value)
-    await db.commit()
-    await db.refresh(result)
-    return result
-
-@router.delete("/journal_entries/{journal_entry_id}", tags=["Отслеживание прогресса обучения - журнал"],\
-             summary="Удаление записи в журнале")
-async def delete_journal_entry(journal_entry_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_journal_entry = await db.execute(select(JournalEntry).filter(JournalEntry.id == journal_entry_id))
-    result = db_journal_entry.scalar()
-    if not result:
-        raise HTTPException(status_code=404, detail="Запись не найдена")
-    await db.delete(result)
-    await db.commit()
-
-    return {"message": "Запись удалена"}
+router.include_router(crud_router(
+    JournalEntry, JournalEntryCreate, JournalEntryUpdate, JournalEntryResponse,
+    name="journal_entry", plural="journal_entries", tag="Отслеживание прогресса обучения - журнал",
+    cache_ttl=settings.CACHE_TTL, filters=JOURNAL_FILTERS,
+    summaries={
+        "create": "Добавление сведений о проведенном занятии",
+        "list": "Получение всего журнала записей о занятиях",
+        "get": "Поиск записи в журнале",
+        "update": "Обновление записи в журнале",
+        "delete": "Удаление записи в журнале",
+    },
+))
@@ -0,0 +1,76 @@
+import csv
+import datetime as dt
+import io
+import uuid
+from typing import Literal, Optional
+import orjson
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from config import settings
+from database import session_for
+from models.models import *
+from security import get_current_user
+
+router = APIRouter()
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+# Строки читаются серверным курсором пачками, без ORM-объектов и identity map,
+# поэтому потребление памяти не зависит от объема выгрузки
+async def stream_rows(session_factory, query, fmt: str):
+    async with session_factory() as session:
+        result = await session.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        async for rows in result.partitions():
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield b"".join(orjson.dumps(dict(zip(columns, row)), default=str) + b"\n" for row in rows)
+
+
+def export_response(request: Request, query, fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(session_for(request), query, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+@router.get("/export/journal_entries/", dependencies=[Depends(get_current_user)],
+            tags=["Отслеживание прогресса обучения - журнал"], summary="Выгрузка журнала в NDJSON или CSV")
+async def export_journal_entries(request: Request, format: Literal["ndjson", "csv"] = "ndjson",
+                                 student_id: Optional[uuid.UUID] = None,
+                                 date_from: Optional[dt.date] = None, date_to: Optional[dt.date] = None):
+    query = select(JournalEntry.id, JournalEntry.date, JournalEntry.content, JournalEntry.student_id)
+    if student_id is not None:
+        query = query.filter(JournalEntry.student_id == student_id)
+    if date_from is not None:
+        query = query.filter(JournalEntry.date >= date_from)
+    if date_to is not None:
+        query = query.filter(JournalEntry.date <= date_to)
+    return export_response(request, query.order_by(JournalEntry.date, JournalEntry.id), format, "journal")
+
+@router.get("/export/schedules/", dependencies=[Depends(get_current_user)],
+            tags=["Расписание занятий"], summary="Выгрузка истории занятий в NDJSON или CSV")
+async def export_schedules(request: Request, format: Literal["ndjson", "csv"] = "ndjson",
+                           student_id: Optional[uuid.UUID] = None,
+                           date_from: Optional[dt.date] = None, date_to: Optional[dt.date] = None):
+    query = select(Schedule.id, Schedule.date, Schedule.time, Schedule.duration_minutes, Schedule.student_id,
+                   Schedule.tutor_id, Schedule.place_id)
+    if student_id is not None:
+        query = query.filter(Schedule.student_id == student_id)
+    if date_from is not None:
+        query = query.filter(Schedule.date >= date_from)
+    if date_to is not None:
+        query = query.filter(Schedule.date <= date_to)
+    return export_response(request, query.order_by(Schedule.date, Schedule.time, Schedule.id), format, "schedules")
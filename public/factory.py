@@ -0,0 +1,138 @@
+import uuid
+from typing import List, get_args
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.exceptions import RequestValidationError
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from cache import entity_cache
+from database import async_engine, get_read_db, get_write_db
+from public.pagination import PageParams, fetch_page
+from public.query import fields_param, filter_params, partial_schema
+from security import get_current_user
+
+auth = [Depends(get_current_user)]
+
+
+# Чтение по идентификатору через кэш; в кэше хранится уже сериализованный ответ.
+# Кэш заполняется только из основной БД: строка с реплики может быть старше
+# последней записи, и после сброса кэша она прожила бы в нем весь TTL
+async def get_cached(db: Session, model, schema, object_id: uuid.UUID, ttl: float):
+    cached = await entity_cache.get(model.__tablename__, object_id)
+    if cached is not None:
+        return cached
+    generation = entity_cache.generation(model.__tablename__)
+    result = await db.execute(select(model).filter(model.id == object_id))
+    result = result.scalar()
+    if not result:
+        raise HTTPException(status_code=404, detail="Запись не найдена")
+    value = schema.model_validate(result, from_attributes=True).dict()
+    if db.bind is async_engine:
+        await entity_cache.set(model.__tablename__, object_id, value, ttl, generation)
+    return value
+
+
+# Поля, в которые нельзя записать null: NOT NULL в таблице или обязательные в ответе.
+# Явный null в PUT/PATCH для них - ошибка 422, а не строка, которую потом не отдать клиенту
+def non_nullable(model, schema) -> set:
+    fields = {column.name for column in model.__table__.columns if not column.nullable}
+    fields |= {name for name, field in schema.model_fields.items() if type(None) not in get_args(field.annotation)}
+    return fields
+
+
+def reject_nulls(data: dict, fields: set):
+    errors = [{"type": "none_forbidden", "loc": ("body", name), "msg": "Поле не может быть null", "input": None}
+              for name, value in data.items() if value is None and name in fields]
+    if errors:
+        raise RequestValidationError(errors)
+
+
+async def execute_write(db: Session, statement):
+    try:
+        result = await db.execute(statement)
+        row = result.mappings().first()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Нарушение ограничений целостности данных")
+    return row
+
+
+# Набор CRUD-маршрутов для одной сущности. Каждая запись в БД - один запрос:
+# INSERT/UPDATE/DELETE ... RETURNING вместо SELECT + изменение + COMMIT + refresh.
+# cascades - сущности, записи которых БД удаляет или изменяет вместе с удаляемой
+# (ON DELETE CASCADE / SET NULL): их кэш сбрасывается целиком; filters - фильтры списка
+# (см. public.query.filter_params)
+def crud_router(model, create_schema, update_schema, response_schema, *, name: str, plural: str, tag: str,
+                summaries: dict, cache_ttl: float, prepare_create=None, prepare_update=None, after_write=None,
+                public_create: bool = False, cascades: tuple = (), filters: dict | None = None) -> APIRouter:
+    router = APIRouter(tags=[tag])
+    entity = model.__tablename__
+    columns = [model.__table__.c[field] for field in response_schema.model_fields]
+    list_schema = partial_schema(response_schema)
+    required = non_nullable(model, response_schema)
+
+    async def create_item(item: create_schema, db: Session = Depends(get_write_db)):
+        data = item.dict()
+        if prepare_create is not None:
+            data = await prepare_create(data, db)
+        row = await execute_write(db, insert(model).values(**data).returning(*columns))
+        if after_write is not None:
+            after_write("create", row)
+        return row
+
+    async def list_items(response: Response, page: PageParams = Depends(),
+                         selected: list = Depends(fields_param(model, response_schema)),
+                         conditions: list = Depends(filter_params(filters or {})),
+                         db: Session = Depends(get_read_db)):
+        return await fetch_page(response, db, model, page, selected, conditions)
+
+    async def get_item(object_id: uuid.UUID, db: Session = Depends(get_read_db)):
+        return await get_cached(db, model, response_schema, object_id, cache_ttl)
+
+    # Обновляются только переданные поля (семантика PATCH, в том числе для PUT)
+    async def update_item(object_id: uuid.UUID, item: update_schema, db: Session = Depends(get_write_db)):
+        data = item.dict(exclude_unset=True)
+        reject_nulls(data, required)
+        if prepare_update is not None:
+            data = await prepare_update(object_id, data, db)
+        if data:
+            statement = (update(model).where(model.id == object_id).values(**data).returning(*columns)
+                         .execution_options(synchronize_session=False))
+        else:
+            statement = select(*columns).where(model.id == object_id)
+        row = await execute_write(db, statement)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Запись не найдена")
+        await entity_cache.invalidate(entity, object_id)
+        if after_write is not None:
+            after_write("update", row)
+        return row
+
+    async def delete_item(object_id: uuid.UUID, db: Session = Depends(get_write_db)):
+        statement = delete(model).where(model.id == object_id).returning(*columns)
+        row = await execute_write(db, statement.execution_options(synchronize_session=False))
+        if row is None:
+            raise HTTPException(status_code=404, detail="Запись не найдена")
+        await entity_cache.invalidate(entity, object_id)
+        for dependent in cascades:
+            await entity_cache.invalidate_all(dependent)
+        if after_write is not None:
+            after_write("delete", row)
+        return {"message": "Запись удалена"}
+
+    path = f"/{plural}/{{object_id}}"
+    router.add_api_route(f"/{plural}/", create_item, methods=["POST"], response_model=response_schema,
+                         dependencies=[] if public_create else auth, name=f"create_{name}",
+                         summary=summaries["create"])
+    router.add_api_route(f"/{plural}/", list_items, methods=["GET"], response_model=List[list_schema],
+                         response_model_exclude_unset=True, dependencies=auth, name=f"get_{plural}", summary=summaries["list"])
+    router.add_api_route(path, get_item, methods=["GET"], response_model=response_schema,
+                         dependencies=auth, name=f"get_{name}", summary=summaries["get"])
+    router.add_api_route(path, update_item, methods=["PUT"], response_model=response_schema,
+                         dependencies=auth, name=f"update_{name}", summary=summaries["update"])
+    router.add_api_route(path, update_item, methods=["PATCH"], response_model=response_schema,
+                         dependencies=auth, name=f"patch_{name}", summary=summaries["update"])
+    router.add_api_route(path, delete_item, methods=["DELETE"],
+                         dependencies=auth, name=f"delete_{name}", summary=summaries["delete"])
+    return router
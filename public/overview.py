@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import false, select, tuple_
+from sqlalchemy.orm import Session, joinedload
+from database import get_read_db
+from models.models import *
+from models.schemas import *
+from security import get_current_user
+
+router = APIRouter()
+
+
+# Ближайшие занятия: (date, time) >= сейчас, по индексу (student_id|tutor_id, date, time)
+def upcoming_lessons(column, owner_id: uuid.UUID, limit: int, *relations):
+    now = datetime.now()
+    return (
+        select(Schedule)
+        .options(*(joinedload(relation) for relation in relations))
+        .filter(column == owner_id, tuple_(Schedule.date, Schedule.time) >= (now.date(), now.time()))
+        .order_by(Schedule.date, Schedule.time)
+        .limit(limit)
+    )
+
+# Сводка ученика собирается фиксированным числом запросов (4) независимо от объема данных
+@router.get("/students/{student_id}/overview", response_model=StudentOverview, dependencies=[Depends(get_current_user)],
+            tags=["Ученики"], summary="Сводка по ученику: ближайшие занятия, уведомления, журнал")
+async def student_overview(student_id: uuid.UUID, lessons_limit: int = Query(10, ge=0, le=100),
+                           notifications_limit: int = Query(10, ge=0, le=100),
+                           journal_limit: int = Query(10, ge=0, le=100), db: Session = Depends(get_read_db)):
+    student = await db.get(Student, student_id)
+    if not student:
+        raise HTTPException(status_code=404, detail="Запись не найдена")
+    lessons = await db.execute(
+        upcoming_lessons(Schedule.student_id, student_id, lessons_limit, Schedule.tutor, Schedule.place))
+    notifications = await db.execute(
+        select(Notification)
+        .filter(Notification.student_id == student_id, Notification.is_read == false())
+        .order_by(Notification.created_at.desc())
+        .limit(notifications_limit)
+    )
+    journal_entries = await db.execute(
+        select(JournalEntry)
+        .filter(JournalEntry.student_id == student_id)
+        .order_by(JournalEntry.date.desc())
+        .limit(journal_limit)
+    )
+    return {
+        "student": student,
+        "upcoming_lessons": lessons.scalars().all(),
+        "unread_notifications": notifications.scalars().all(),
+        "recent_journal_entries": journal_entries.scalars().all(),
+    }
+
+@router.get("/tutors/{tutor_id}/overview", response_model=TutorOverview, dependencies=[Depends(get_current_user)],
+            tags=["Репетиторы"], summary="Сводка по репетитору: ближайшие занятия с учениками и местами")
+async def tutor_overview(tutor_id: uuid.UUID, lessons_limit: int = Query(10, ge=0, le=100),
+                         db: Session = Depends(get_read_db)):
+    tutor = await db.get(Tutor, tutor_id)
+    if not tutor:
+        raise HTTPException(status_code=404, detail="Запись не найдена")
+    lessons = await db.execute(
+        upcoming_lessons(Schedule.tutor_id, tutor_id, lessons_limit, Schedule.student, Schedule.place))
+    return {"tutor": tutor, "upcoming_lessons": lessons.scalars().all()}
@@ -0,0 +1,71 @@
+import base64
+import uuid
+from typing import Optional
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+
+# Параметры постраничного вывода: курсор (keyset по первичному ключу) или старый skip
+class PageParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+        skip: int = Query(0, ge=0),
+        limit: int = Query(10, ge=1, le=1000),
+        with_total: bool = Query(False, description="Вернуть оценку общего числа записей в X-Total-Estimate"),
+    ):
+        self.cursor = cursor
+        self.skip = skip
+        self.limit = limit
+        self.with_total = with_total
+
+
+def encode_cursor(key: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(key.bytes).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> uuid.UUID:
+    try:
+        return uuid.UUID(bytes=base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def paginate(query, model, page: PageParams):
+    query = query.order_by(model.id).limit(page.limit)
+    if page.cursor:
+        return query.filter(model.id > decode_cursor(page.cursor))
+    return query.offset(page.skip)
+
+
+# Оценка числа строк по статистике планировщика вместо COUNT(*). Секционированную
+# родительскую таблицу autovacuum не анализирует (reltuples = -1) - складываются
+# оценки ее секций; еще не проанализированная секция считается пустой
+async def estimate_count(db: Session, model) -> int:
+    if db.bind.dialect.name != "postgresql":
+        return await db.scalar(select(func.count()).select_from(model))
+    result = await db.execute(
+        text("SELECT CASE WHEN c.relkind = 'p' THEN ("
+             "    SELECT coalesce(sum(greatest(p.reltuples, 0)), 0) FROM pg_inherits i"
+             "    JOIN pg_class p ON p.oid = i.inhrelid WHERE i.inhparent = c.oid"
+             ") ELSE c.reltuples END::bigint FROM pg_class c WHERE c.oid = to_regclass(:table)"),
+        {"table": model.__tablename__},
+    )
+    return max(result.scalar() or 0, 0)
+
+
+async def set_page_headers(response: Response, db: Session, model, items, page: PageParams):
+    if len(items) == page.limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(items[-1].id)
+    if page.with_total:
+        response.headers["X-Total-Estimate"] = str(await estimate_count(db, model))
+
+
+# columns - выбираемые столбцы (строки вместо ORM-объектов), conditions - условия фильтров
+async def fetch_page(response: Response, db: Session, model, page: PageParams, columns=None, conditions=()):
+    query = (select(*columns) if columns else select(model)).where(*conditions)
+    result = await db.execute(paginate(query, model, page))
+    items = result.all() if columns else result.scalars().all()
+    await set_page_headers(response, db, model, items, page)
+    return items
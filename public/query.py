@@ -0,0 +1,63 @@
+import inspect
+import operator
+from typing import Optional
+from fastapi import HTTPException, Query
+from pydantic import ConfigDict, create_model
+
+DESCRIPTIONS = {operator.eq: "равно", operator.ge: "не меньше", operator.le: "не больше"}
+
+
+# Фильтры списка из белого списка: имя параметра -> (столбец, оператор[, значение по
+# умолчанию]). Значение по умолчанию - функция без аргументов; так задается окно недавних
+# записей, чтобы запрос без фильтра по ключу секционирования не читал все секции.
+# Зависимость строится по списку, чтобы каждый фильтр был отдельным типизированным
+# query-параметром в OpenAPI; каждому фильтру в БД соответствует индекс
+def filter_params(filters: dict):
+    parameters = [
+        inspect.Parameter(
+            name, inspect.Parameter.KEYWORD_ONLY,
+            default=Query(None, description=f"{column.name} {DESCRIPTIONS[op]}"
+                                            + (" (по умолчанию - окно недавних записей)" if default else "")),
+            annotation=Optional[column.type.python_type],
+        )
+        for name, (column, op, *default) in filters.items()
+    ]
+
+    def dependency(**values) -> list:
+        conditions = []
+        for name, value in values.items():
+            column, op, *default = filters[name]
+            if value is None and default:
+                value = default[0]()
+            if value is not None:
+                conditions.append(op(column, value))
+        return conditions
+
+    dependency.__signature__ = inspect.Signature(parameters)
+    return dependency
+
+
+# Ответ списка с выбранными полями: все поля необязательны, невыбранные не попадают в JSON
+# (response_model_exclude_unset)
+def partial_schema(schema):
+    fields = {name: (Optional[field.annotation], None) for name, field in schema.model_fields.items()}
+    return create_model(f"{schema.__name__}Fields", __config__=ConfigDict(from_attributes=True), **fields)
+
+
+# Параметр fields=: список столбцов для SELECT; id выбирается всегда (нужен курсору)
+def fields_param(model, schema):
+    available = list(schema.model_fields)
+
+    def dependency(fields: Optional[str] = Query(
+            None, description=f"Поля ответа через запятую: {','.join(available)}")) -> list:
+        if not fields:
+            names = available
+        else:
+            names = [name.strip() for name in fields.split(",") if name.strip()]
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}")
+            names = ["id"] + [name for name in available if name in names and name != "id"]
+        return [model.__table__.c[name] for name in names]
+
+    return dependency
@@ -0,0 +1,132 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+import orjson
+from fastapi import APIRouter, Query, WebSocket
+from sqlalchemy import select, tuple_
+from config import settings
+from database import async_session
+from models.models import Notification
+from pubsub import DROPPED, RESYNC, hub
+from security import TokenError, decode_token
+
+router = APIRouter()
+
+FIELDS = (Notification.id, Notification.message, Notification.student_id, Notification.schedule_id,
+          Notification.kind, Notification.created_at)
+
+
+def dump(row: dict) -> str:
+    return orjson.dumps(row, default=str).decode()
+
+
+async def load_notification(notification_id):
+    async with async_session() as session:
+        row = (await session.execute(select(*FIELDS).where(Notification.id == notification_id))).mappings().first()
+    return dict(row) if row is not None else None
+
+
+async def initial_cursor(student_id: str, last_id: uuid.UUID | None) -> tuple:
+    if last_id is not None:
+        async with async_session() as session:
+            created_at = await session.scalar(
+                select(Notification.created_at).where(Notification.id == last_id, Notification.student_id == student_id))
+        if created_at is not None:
+            return created_at, last_id
+    return datetime.now(timezone.utc), uuid.UUID(int=0)
+
+
+# Досылка уведомлений после cursor = (created_at, id) по индексу (student_id, created_at, id)
+async def replay(websocket: WebSocket, student_id: str, cursor: tuple, seen: set) -> tuple:
+    while True:
+        async with async_session() as session:
+            rows = (await session.execute(
+                select(*FIELDS)
+                .where(Notification.student_id == student_id,
+                       tuple_(Notification.created_at, Notification.id) > cursor)
+                .order_by(Notification.created_at, Notification.id)
+                .limit(settings.REALTIME_REPLAY_LIMIT)
+            )).mappings().all()
+        for row in rows:
+            await send(websocket, dict(row))
+            seen.add(str(row["id"]))
+            cursor = row["created_at"], row["id"]
+        if len(rows) < settings.REALTIME_REPLAY_LIMIT:
+            return cursor
+
+
+async def send(websocket: WebSocket, row: dict):
+    await asyncio.wait_for(websocket.send_text(dump(row)), settings.REALTIME_SEND_TIMEOUT)
+
+
+async def wait_disconnect(websocket: WebSocket):
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+# Токен проверяется не только при подключении: соединение закрывается с кодом 4401,
+# как только истекает срок действия токена или он отзывается (logout, refresh)
+async def watch_token(token: str, claims: dict) -> str:
+    while True:
+        await asyncio.sleep(max(min(claims["exp"] - time.time(), settings.REALTIME_AUTH_CHECK_INTERVAL), 0))
+        try:
+            decode_token(token)
+        except TokenError as e:
+            return str(e)
+
+
+# Браузер не может передать заголовок Authorization при открытии WebSocket,
+# поэтому access-токен передается параметром token
+@router.websocket("/ws/notifications")
+async def notifications_ws(websocket: WebSocket, token: str = Query(...), last_id: uuid.UUID | None = Query(None)):
+    # Соединение принимается до проверки, чтобы клиент получил код закрытия, а не HTTP 403
+    await websocket.accept()
+    try:
+        claims = decode_token(token)
+    except TokenError as e:
+        await websocket.close(code=4401, reason=str(e))
+        return
+    if claims["role"] != "student":
+        await websocket.close(code=4403, reason="Подписка доступна только ученикам")
+        return
+    student_id = claims["sub"]
+    # Подписываемся до досылки, чтобы не потерять события, пришедшие во время нее
+    subscriber = hub.subscribe(student_id)
+    disconnected = asyncio.create_task(wait_disconnect(websocket))
+    expired = asyncio.create_task(watch_token(token, claims))
+    try:
+        seen = set()
+        cursor = await replay(websocket, student_id, await initial_cursor(student_id, last_id), seen)
+        while True:
+            received = asyncio.create_task(subscriber.queue.get())
+            done, _ = await asyncio.wait({received, disconnected, expired}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                received.cancel()
+                return
+            if expired in done:
+                received.cancel()
+                await websocket.close(code=4401, reason=expired.result())
+                return
+            event = received.result()
+            if event is DROPPED:
+                await websocket.close(code=1013, reason="Клиент не успевает получать уведомления")
+                return
+            if event is RESYNC:
+                cursor = await replay(websocket, student_id, cursor, seen)
+                continue
+            if event["id"] in seen:
+                continue
+            if "created_at" not in event:
+                event = await load_notification(event["id"])
+                if event is None:
+                    continue
+            await send(websocket, event)
+            cursor = (datetime.fromisoformat(event["created_at"]) if isinstance(event["created_at"], str)
+                      else event["created_at"]), uuid.UUID(str(event["id"]))
+    except asyncio.TimeoutError:
+        await websocket.close(code=1013, reason="Клиент не успевает получать уведомления")
+    finally:
+        hub.unsubscribe(subscriber)
+        disconnected.cancel()
+        expired.cancel()
@@ -0,0 +1,90 @@
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import case, func, literal, literal_column, or_, select, union_all
+from sqlalchemy.orm import Session
+from config import settings
+from database import get_read_db
+from models.models import *
+from models.schemas import *
+from security import get_current_user
+
+router = APIRouter(tags=["Поиск"], dependencies=[Depends(get_current_user)])
+
+# Столбец content_tsv вычисляется в БД (миграция 0007) и в модели не описан
+content_tsv = literal_column("journal_entry.content_tsv")
+
+
+class SearchParams:
+    def __init__(
+        self,
+        q: str = Query(..., min_length=2, max_length=200, description="Поисковый запрос"),
+        skip: int = Query(0, ge=0),
+        limit: int = Query(10, ge=1, le=settings.SEARCH_MAX_LIMIT),
+    ):
+        self.q = q.strip()
+        self.skip = skip
+        self.limit = limit
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Оценка совпадения по триграммам; точное совпадение префикса поднимается выше
+def fuzzy_match(column, q: str):
+    prefix = column.ilike(escape_like(q) + "%", escape="\\")
+    score = (func.similarity(column, q) + case((prefix, 1.0), else_=0.0)).label("score")
+    return or_(column.op("%")(q), prefix), score
+
+
+@router.get("/search/journal", response_model=List[JournalSearchResult],
+            summary="Полнотекстовый поиск по записям журнала")
+async def search_journal(params: SearchParams = Depends(), student_id: Optional[uuid.UUID] = None,
+                         db: Session = Depends(get_read_db)):
+    # websearch_to_tsquery понимает обычный текст, "фразы", OR и -исключения
+    query = func.websearch_to_tsquery("russian", params.q)
+    rank = func.ts_rank_cd(content_tsv, query).label("rank")
+    statement = select(JournalEntry.id, JournalEntry.date, JournalEntry.content, JournalEntry.student_id, rank) \
+        .where(content_tsv.op("@@")(query))
+    if student_id is not None:
+        statement = statement.where(JournalEntry.student_id == student_id)
+    page = statement.order_by(rank.desc(), JournalEntry.date.desc(), JournalEntry.id) \
+        .offset(params.skip).limit(params.limit).subquery()
+    # Фрагменты с подсветкой строятся только для строк текущей страницы
+    headline = func.ts_headline("russian", page.c.content, query, "MaxFragments=2, MinWords=5, MaxWords=20")
+    result = await db.execute(select(page, headline.label("headline")).order_by(page.c.rank.desc(), page.c.date.desc(),
+                                                                               page.c.id))
+    return result.mappings().all()
+
+@router.get("/search/people", response_model=List[PersonSearchResult],
+            summary="Поиск учеников и репетиторов по фамилии с учетом опечаток")
+async def search_people(params: SearchParams = Depends(), role: Optional[str] = Query(None, pattern="^(student|tutor)$"),
+                        db: Session = Depends(get_read_db)):
+    selects = []
+    for model, model_role in ((Student, "student"), (Tutor, "tutor")):
+        if role in (None, model_role):
+            condition, score = fuzzy_match(model.lastname, params.q)
+            selects.append(select(model.id, literal(model_role).label("role"), model.lastname, model.name, score)
+                           .where(condition))
+    people = union_all(*selects).subquery()
+    result = await db.execute(
+        select(people)
+        .order_by(people.c.score.desc(), people.c.lastname, people.c.id)
+        .offset(params.skip)
+        .limit(params.limit)
+    )
+    return result.mappings().all()
+
+@router.get("/search/places", response_model=List[PlaceSearchResult],
+            summary="Поиск мест проведения занятий по названию с учетом опечаток")
+async def search_places(params: SearchParams = Depends(), db: Session = Depends(get_read_db)):
+    condition, score = fuzzy_match(Place.name, params.q)
+    result = await db.execute(
+        select(Place.id, Place.name, Place.address, score)
+        .where(condition)
+        .order_by(score.desc(), Place.name, Place.id)
+        .offset(params.skip)
+        .limit(params.limit)
+    )
+    return result.mappings().all()
@@ -0,0 +1,97 @@
+import calendar
+import datetime as dt
+import uuid
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import column, func, select, table
+from sqlalchemy.orm import Session
+from config import settings
+from database import get_read_db
+from models.models import *
+from models.schemas import *
+from partitions import add_months
+from security import get_current_user
+
+router = APIRouter()
+
+# Материализованное представление (миграция 0012) в модели не описано
+student_streaks = table("student_streaks", column("student_id"), column("longest_streak"),
+                        column("current_streak"), column("last_week"))
+
+
+def first_month(months: int) -> dt.date:
+    return add_months(dt.date.today().replace(day=1), 1 - months)
+
+
+def working_minutes(month: dt.date) -> int:
+    start = dt.datetime.combine(month, settings.AVAILABILITY_DAY_START)
+    day = dt.datetime.combine(month, settings.AVAILABILITY_DAY_END) - start
+    return calendar.monthrange(month.year, month.month)[1] * int(day.total_seconds()) // 60
+
+
+def with_utilisation(rows) -> list:
+    return [{**row, "utilisation": round(row["lesson_minutes"] / (working_minutes(row["month"]) or 1), 4)}
+            for row in rows]
+
+
+# Итоги за все время - сумма помесячных строк владельца по первичному ключу
+async def totals(db: Session, owner_column, owner_id: uuid.UUID, *counters) -> dict:
+    result = await db.execute(
+        select(*(func.coalesce(func.sum(counter), 0).label(counter.name) for counter in counters))
+        .where(owner_column == owner_id)
+    )
+    return dict(result.mappings().one())
+
+
+async def monthly(db: Session, model, owner_column, owner_id: uuid.UUID, months: int, *counters) -> list:
+    result = await db.execute(
+        select(model.month, *counters)
+        .where(owner_column == owner_id, model.month >= first_month(months))
+        .order_by(model.month)
+    )
+    return [dict(row) for row in result.mappings().all()]
+
+# Статистика читается из таблиц, которые триггеры БД обновляют при каждом изменении
+# расписания и журнала, поэтому запросы не зависят от объема истории
+@router.get("/stats/students/{student_id}", response_model=StudentStats, dependencies=[Depends(get_current_user)],
+            tags=["Статистика"], summary="Статистика ученика: занятия, записи журнала и серии посещений")
+async def student_stats(student_id: uuid.UUID, months: int = Query(12, ge=1, le=120),
+                        db: Session = Depends(get_read_db)):
+    counters = (StudentMonthlyStats.lessons, StudentMonthlyStats.lesson_minutes, StudentMonthlyStats.journal_entries)
+    summary = await totals(db, StudentMonthlyStats.student_id, student_id, *counters)
+    rows = await monthly(db, StudentMonthlyStats, StudentMonthlyStats.student_id, student_id, months, *counters)
+    streak = (await db.execute(
+        select(student_streaks).where(student_streaks.c.student_id == student_id)
+    )).mappings().first()
+    return {
+        "student_id": student_id,
+        **summary,
+        "longest_streak": streak["longest_streak"] if streak else 0,
+        "current_streak": streak["current_streak"] if streak else 0,
+        "last_active_week": streak["last_week"] if streak else None,
+        "months": rows,
+    }
+
+@router.get("/stats/tutors/{tutor_id}", response_model=TutorStats, dependencies=[Depends(get_current_user)],
+            tags=["Статистика"], summary="Загрузка репетитора по месяцам и число занятий с каждым учеником")
+async def tutor_stats(tutor_id: uuid.UUID, months: int = Query(12, ge=1, le=120),
+                      students_limit: int = Query(20, ge=0, le=1000), db: Session = Depends(get_read_db)):
+    counters = (TutorMonthlyStats.lessons, TutorMonthlyStats.lesson_minutes)
+    summary = await totals(db, TutorMonthlyStats.tutor_id, tutor_id, *counters)
+    rows = await monthly(db, TutorMonthlyStats, TutorMonthlyStats.tutor_id, tutor_id, months, *counters)
+    students = await db.execute(
+        select(TutorStudentStats.student_id, TutorStudentStats.lessons, TutorStudentStats.lesson_minutes)
+        .where(TutorStudentStats.tutor_id == tutor_id, TutorStudentStats.lessons > 0)
+        .order_by(TutorStudentStats.lessons.desc(), TutorStudentStats.student_id)
+        .limit(students_limit)
+    )
+    return {"tutor_id": tutor_id, **summary, "months": with_utilisation(rows),
+            "students": students.mappings().all()}
+
+@router.get("/stats/places/{place_id}", response_model=PlaceStats, dependencies=[Depends(get_current_user)],
+            tags=["Статистика"], summary="Загрузка места занятий по месяцам")
+async def place_stats(place_id: uuid.UUID, months: int = Query(12, ge=1, le=120),
+                      db: Session = Depends(get_read_db)):
+    counters = (PlaceMonthlyStats.lessons, PlaceMonthlyStats.lesson_minutes)
+    summary = await totals(db, PlaceMonthlyStats.place_id, place_id, *counters)
+    rows = await monthly(db, PlaceMonthlyStats, PlaceMonthlyStats.place_id, place_id, months, *counters)
+    return {"place_id": place_id, **summary, "months": with_utilisation(rows)}
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import asyncpg
+import orjson
+from cache import INVALIDATION_CHANNEL, entity_cache
+from config import settings
+from database import URL
+from metrics import Counter, Gauge
+from security import REVOCATION_CHANNEL, reload_revoked_tokens, revoked_tokens
+
+log = logging.getLogger("tutorhelper.pubsub")
+
+CHANNEL = "notification"
+# asyncpg принимает DSN без драйвера SQLAlchemy: postgresql+asyncpg:// -> postgresql://
+LISTEN_DSN = URL.set(drivername="postgresql").render_as_string(hide_password=False)
+# Служебные сообщения в очереди подписчика
+DROPPED = object()  # подписчик не успевает читать и отключается
+RESYNC = object()  # соединение LISTEN переподключалось, часть событий могла потеряться
+
+SUBSCRIBERS = Gauge("ws_subscribers", "Активные подписки на уведомления")
+DROPPED_TOTAL = Counter("ws_subscribers_dropped_total", "Подписчики, отключенные из-за отставания")
+EVENTS = Counter("pubsub_events_total", "События NOTIFY, полученные процессом")
+
+
+class Subscriber:
+    def __init__(self, student_id: str):
+        self.student_id = student_id
+        self.queue = asyncio.Queue(maxsize=settings.REALTIME_QUEUE_SIZE)
+
+    def push(self, item) -> bool:
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            # Очередь не растет бесконечно: отстающий подписчик получает DROPPED
+            # и переподключается с last_id, недополученное досылается из БД
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(DROPPED)
+            return False
+
+
+# Одно соединение LISTEN на процесс; события раздаются подписчикам в памяти,
+# сообщения о сбросе кэша и отзыве токенов применяются к копиям в памяти процесса
+class NotificationHub:
+    def __init__(self):
+        self.subscribers = {}
+        self.task = None
+        self.connected = asyncio.Event()
+
+    async def start(self):
+        self.task = asyncio.create_task(self._listen(), name="pubsub-listen")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def subscribe(self, student_id: str) -> Subscriber:
+        subscriber = Subscriber(student_id)
+        self.subscribers.setdefault(student_id, set()).add(subscriber)
+        SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        group = self.subscribers.get(subscriber.student_id)
+        if group is not None and subscriber in group:
+            group.discard(subscriber)
+            SUBSCRIBERS.dec()
+            if not group:
+                del self.subscribers[subscriber.student_id]
+
+    def publish(self, event: dict):
+        for subscriber in list(self.subscribers.get(event["student_id"], ())):
+            if not subscriber.push(event):
+                DROPPED_TOTAL.inc()
+                self.unsubscribe(subscriber)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        EVENTS.inc()
+        try:
+            event = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            log.warning("Некорректное событие %s: %r", channel, payload[:200])
+            return
+        self.publish(event)
+
+    def _on_invalidate(self, connection, pid, channel, payload):
+        entity_cache.drop(payload)
+
+    def _on_revoke(self, connection, pid, channel, payload):
+        jti, _, exp = payload.partition(" ")
+        try:
+            revoked_tokens.add(jti, float(exp))
+        except ValueError:
+            log.warning("Некорректное событие %s: %r", channel, payload[:200])
+
+    async def _listen(self):
+        delay = 1
+        first = True
+        while True:
+            closed = asyncio.Event()
+            connection = None
+            try:
+                connection = await asyncpg.connect(settings.REALTIME_LISTEN_URL or LISTEN_DSN)
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(CHANNEL, self._on_notify)
+                await connection.add_listener(INVALIDATION_CHANNEL, self._on_invalidate)
+                await connection.add_listener(REVOCATION_CHANNEL, self._on_revoke)
+                # Отзывы, сделанные до подписки (в том числе до запуска процесса)
+                await reload_revoked_tokens()
+                self.connected.set()
+                delay = 1
+                if not first:
+                    # Пока соединения не было, сообщения о сбросе могли потеряться
+                    entity_cache.clear_local()
+                    for group in list(self.subscribers.values()):
+                        for subscriber in list(group):
+                            subscriber.push(RESYNC)
+                first = False
+                await closed.wait()
+                log.warning("Соединение LISTEN закрыто, переподключение")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Ошибка соединения LISTEN: %r, повтор через %d с", e, delay)
+            finally:
+                self.connected.clear()
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+hub = NotificationHub()
@@ -0,0 +1,230 @@
+import asyncio
+import base64
+import datetime as dt
+import hashlib
+import heapq
+import hmac
+import json
+import logging
+import secrets
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from passlib.context import CryptContext
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from config import settings
+from database import async_session
+from models.models import RevokedToken
+
+log = logging.getLogger("tutorhelper.security")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+_executor: Executor | None = None
+
+
+# bcrypt отпускает GIL, поэтому пула потоков обычно достаточно;
+# пул процессов нужен, если хеширование упирается в CPU одного процесса
+def get_hash_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if settings.HASH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=settings.HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=settings.HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def shutdown_hash_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), partial(_hash, password))
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), partial(_verify, password, hashed))
+
+
+# Токены в формате JWT (HS256): проверяются локально, без обращения к БД
+class TokenError(Exception):
+    pass
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+_TOKEN_HEADER = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+_secret = settings.SECRET_KEY.encode()
+
+
+def _sign(signing_input: str) -> str:
+    return _b64encode(hmac.new(_secret, signing_input.encode(), hashlib.sha256).digest())
+
+
+def create_token(user_id, username: str, role: str, token_type: str) -> str:
+    now = int(time.time())
+    ttl = settings.ACCESS_TOKEN_TTL if token_type == "access" else settings.REFRESH_TOKEN_TTL
+    payload = {
+        "sub": str(user_id),
+        "username": username,
+        "role": role,
+        "type": token_type,
+        "iat": now,
+        "exp": now + ttl,
+        "jti": secrets.token_urlsafe(12),
+    }
+    signing_input = f"{_TOKEN_HEADER}.{_b64encode(json.dumps(payload, separators=(',', ':')).encode())}"
+    return f"{signing_input}.{_sign(signing_input)}"
+
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    try:
+        header, payload, signature = token.split(".")
+    except ValueError:
+        raise TokenError("Некорректный токен")
+    if not hmac.compare_digest(_sign(f"{header}.{payload}").encode(), signature.encode()):
+        raise TokenError("Некорректная подпись токена")
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise TokenError("Некорректный токен")
+    if claims.get("type") != token_type:
+        raise TokenError("Неверный тип токена")
+    if claims["exp"] <= time.time():
+        raise TokenError("Срок действия токена истек")
+    if claims["jti"] in revoked_tokens:
+        raise TokenError("Токен отозван")
+    return claims
+
+
+# Отозванные токены хранятся до истечения их срока действия. Это копия таблицы
+# revoked_token в памяти процесса: токены доступа проверяются без обращения к БД
+class RevokedTokens:
+    def __init__(self):
+        self._expires = {}
+        self._heap = []
+
+    def add(self, jti: str, exp: float):
+        self._evict()
+        if jti not in self._expires:
+            self._expires[jti] = exp
+            heapq.heappush(self._heap, (exp, jti))
+
+    def __contains__(self, jti: str) -> bool:
+        exp = self._expires.get(jti)
+        return exp is not None and exp > time.time()
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def _evict(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, jti = heapq.heappop(self._heap)
+            self._expires.pop(jti, None)
+
+
+revoked_tokens = RevokedTokens()
+# Канал NOTIFY: отзыв сразу попадает в копии остальных воркеров (см. pubsub.hub)
+REVOCATION_CHANNEL = "token_revoked"
+
+
+# Первичный ключ таблицы делает отзыв атомарным для всех воркеров: False - токен уже
+# был отозван, например повторное использование одноразового refresh-токена
+async def revoke_token(db, claims: dict) -> bool:
+    revoked_tokens.add(claims["jti"], claims["exp"])
+    now = dt.datetime.now(dt.timezone.utc)
+    try:
+        await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        await db.execute(insert(RevokedToken).values(
+            jti=claims["jti"], expires_at=dt.datetime.fromtimestamp(claims["exp"], dt.timezone.utc)))
+        if db.bind.dialect.name == "postgresql":
+            await db.execute(select(func.pg_notify(REVOCATION_CHANNEL, f"{claims['jti']} {claims['exp']}")))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    return True
+
+
+# В копию загружаются токены, истекающие в пределах срока жизни токена доступа: это все
+# отозванные токены доступа. Повтор refresh-токена отклоняет сама таблица (revoke_token),
+# поэтому копия не растет вместе с историей обновлений за REFRESH_TOKEN_TTL
+async def load_revoked_tokens(db):
+    now = dt.datetime.now(dt.timezone.utc)
+    result = await db.execute(
+        select(RevokedToken.jti, RevokedToken.expires_at)
+        .where(RevokedToken.expires_at > now,
+               RevokedToken.expires_at <= now + dt.timedelta(seconds=settings.ACCESS_TOKEN_TTL))
+    )
+    for jti, expires_at in result.all():
+        revoked_tokens.add(jti, expires_at.timestamp())
+
+
+async def reload_revoked_tokens():
+    async with async_session() as session:
+        await load_revoked_tokens(session)
+
+
+# Без соединения LISTEN (SQLite или выключенные REALTIME_ENABLED и CACHE_INVALIDATION_ENABLED)
+# отзывы других воркеров попадают в копию через REVOCATION_POLL_INTERVAL секунд
+class RevocationPoller:
+    def __init__(self):
+        self.task = None
+
+    async def start(self):
+        self.task = asyncio.create_task(self._loop(), name="revocation-poll")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(settings.REVOCATION_POLL_INTERVAL)
+            try:
+                await reload_revoked_tokens()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Ошибка загрузки отозванных токенов")
+
+
+revocation_poller = RevocationPoller()
+
+
+bearer = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials | None = Depends(bearer)) -> dict:
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Требуется авторизация",
+                            headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return decode_token(credentials.credentials)
+    except TokenError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
@@ -0,0 +1,70 @@
+# Запуск в продакшене: несколько процессов-воркеров на uvloop и httptools.
+#
+#   python server.py                     # воркеров по числу ядер
+#   WORKERS=4 DB_MAX_CONNECTIONS=80 python server.py
+#
+# main.py в режиме __main__ остается однопроцессным запуском для разработки.
+import asyncio
+import importlib.util
+import os
+import uvicorn
+from config import settings
+
+
+def worker_count() -> int:
+    return settings.WORKERS or os.cpu_count() or 1
+
+
+# Каждый воркер держит свой пул; при заданном общем лимите он делится между воркерами
+def pool_limits(workers: int) -> tuple:
+    if not settings.DB_MAX_CONNECTIONS:
+        return settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    per_worker = max(settings.DB_MAX_CONNECTIONS // workers, 2)
+    pool_size = max(per_worker * 3 // 4, 1)
+    return pool_size, per_worker - pool_size
+
+
+# Побочные эффекты старта выполняются один раз в главном процессе
+async def prepare():
+    from database import async_engine, check_schema_version
+    try:
+        await check_schema_version()
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    workers = worker_count()
+    pool_size, max_overflow = pool_limits(workers)
+    asyncio.run(prepare())
+    # Настройки воркеров передаются через окружение: каждый процесс заново создает Settings
+    os.environ.update(
+        STARTUP_CHECKS="false",
+        WEB_CONCURRENCY=str(workers),
+        DB_POOL_SIZE=str(pool_size),
+        DB_MAX_OVERFLOW=str(max_overflow),
+    )
+    if workers > 1 and "LOG_PATH" not in os.environ:
+        # Один файл на воркер, чтобы процессы не мешали друг другу при ротации
+        os.environ["LOG_PATH"] = settings.LOG_PATH = "logs/app-{pid}.log"
+    from eventlog import event_log, setup_logging
+    setup_logging()
+    event_log.emit("server.start", pid=os.getpid(), workers=workers, pool_size=pool_size,
+                   max_overflow=max_overflow, host=settings.HOST, port=settings.PORT)
+    event_log.stop()
+    uvicorn.run(
+        "main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        # По SIGTERM воркер перестает принимать соединения и ждет активные запросы
+        timeout_graceful_shutdown=settings.GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
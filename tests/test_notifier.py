@@ -0,0 +1,117 @@
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+import datetime as dt
+import socketserver
+import threading
+import unittest
+import uuid
+from email import message_from_bytes, policy
+from config import settings
+from notifier import Delivery, Notifier, SmtpChannel
+
+
+# Минимальный SMTP-сервер в потоке теста: принимает письма или отвечает на RCPT
+# заданным кодом (rcpt_reply)
+class SmtpStub(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SmtpHandler)
+        self.messages = []
+        self.rcpt_reply = b"250 OK"
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: bytes):
+        self.wfile.write(line + b"\r\n")
+
+    def handle(self):
+        self.reply(b"220 stub")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().split(b" ", 1)[0].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.reply(b"250 stub")
+            elif command == b"RCPT":
+                self.reply(self.server.rcpt_reply)
+            elif command == b"DATA":
+                self.reply(b"354 end with .")
+                data = []
+                for line in iter(self.rfile.readline, b""):
+                    if line == b".\r\n":
+                        break
+                    data.append(line[1:] if line.startswith(b"..") else line)
+                self.server.messages.append(message_from_bytes(b"".join(data), policy=policy.default))
+                self.reply(b"250 queued")
+            elif command == b"QUIT":
+                self.reply(b"221 bye")
+                return
+            else:
+                self.reply(b"250 OK")
+
+
+class SmtpDeliveryTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = SmtpStub()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.saved = settings.SMTP_HOST, settings.SMTP_PORT, settings.NOTIFY_SEND_TIMEOUT
+        settings.SMTP_HOST, settings.SMTP_PORT = self.server.server_address
+        settings.NOTIFY_SEND_TIMEOUT = 5
+        self.notifier = Notifier()
+        self.notifier.channel = SmtpChannel()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        settings.SMTP_HOST, settings.SMTP_PORT, settings.NOTIFY_SEND_TIMEOUT = self.saved
+
+    async def deliver(self, email="student@example.com", attempts=1) -> dict:
+        await self.notifier.deliver(Delivery(uuid.uuid4(), "Напоминание: занятие", email, attempts))
+        return self.notifier.results[-1]
+
+    async def test_sent(self):
+        result = await self.deliver()
+        self.assertEqual(result["_status"], "sent")
+        self.assertIsNotNone(result["_sent_at"])
+        self.assertIsNone(result["_last_error"])
+        [message] = self.server.messages
+        self.assertEqual(message["To"], "student@example.com")
+        self.assertEqual(message.get_content().strip(), "Напоминание: занятие")
+
+    async def test_rejected_recipient_is_permanent(self):
+        self.server.rcpt_reply = b"550 no such user"
+        result = await self.deliver()
+        self.assertEqual(result["_status"], "failed")
+        self.assertEqual(result["_attempts"], 1)
+        self.assertEqual(self.server.messages, [])
+
+    async def test_missing_email_is_permanent(self):
+        result = await self.deliver(email=None)
+        self.assertEqual(result["_status"], "failed")
+
+    async def test_temporary_rejection_is_retried(self):
+        self.server.rcpt_reply = b"450 mailbox busy"
+        before = dt.datetime.now(dt.timezone.utc)
+        result = await self.deliver(attempts=2)
+        self.assertEqual(result["_status"], "pending")
+        self.assertGreaterEqual(result["_next_attempt_at"] - before,
+                                dt.timedelta(seconds=settings.NOTIFY_RETRY_DELAY * 2))
+
+    async def test_unreachable_server_is_retried_until_max_attempts(self):
+        self.server.shutdown()
+        self.server.server_close()
+        result = await self.deliver(attempts=1)
+        self.assertEqual(result["_status"], "pending")
+        self.assertIsNotNone(result["_last_error"])
+        result = await self.deliver(attempts=settings.NOTIFY_MAX_ATTEMPTS)
+        self.assertEqual(result["_status"], "failed")
+
+
+if __name__ == "__main__":
+    unittest.main()